@@ -57,10 +57,18 @@ def parse_arguments():
     )
     
     parser.add_argument(
-        "--max-workers",
+        "--db-writers",
         type=int,
-        default=3,
-        help="Maximum number of parallel workers"
+        default=2,
+        help="Number of database writer threads in parallel mode "
+             "(MT5 is always read by a single thread)"
+    )
+    
+    parser.add_argument(
+        "--skip-loaded",
+        action="store_true",
+        help="Load only the date range before the first and after the last stored candle "
+             "(gaps inside the stored range are not refilled)"
     )
     
     return parser.parse_args()
@@ -104,7 +112,8 @@ def main():
             start_date=start_date,
             end_date=end_date,
             parallel=args.parallel,
-            max_workers=args.max_workers
+            db_writers=args.db_writers,
+            skip_loaded=args.skip_loaded
         )
         
         loader.run()
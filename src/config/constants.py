@@ -18,50 +18,70 @@ class Timeframe(Enum):
     @property
     def minutes(self) -> int:
         """Возвращает количество минут в таймфрейме"""
-        return {
-            Timeframe.M5: 5,
-            Timeframe.M15: 15,
-            Timeframe.M30: 30,
-            Timeframe.H1: 60,
-            Timeframe.H4: 240,
-            Timeframe.D1: 1440,
-        }[self]
+        return _TIMEFRAME_MINUTES[self]
+    
+    @property
+    def seconds(self) -> int:
+        """Возвращает количество секунд в таймфрейме"""
+        return _TIMEFRAME_SECONDS[self]
     
     @property
     def id(self) -> int:
         """Возвращает ID таймфрейма в базе данных"""
-        return {
-            Timeframe.M5: 3,
-            Timeframe.M15: 4,
-            Timeframe.M30: 8,
-            Timeframe.H1: 5,
-            Timeframe.H4: 6,
-            Timeframe.D1: 7,
-        }[self]
+        return _TIMEFRAME_IDS[self]
     
     @property
     def oanda_format(self) -> str:
         """Возвращает формат таймфрейма для OANDA API"""
-        return {
-            Timeframe.M5: "M5",
-            Timeframe.M15: "M15",
-            Timeframe.M30: "M30",
-            Timeframe.H1: "H1",
-            Timeframe.H4: "H4",
-            Timeframe.D1: "D",
-        }[self]
+        return _TIMEFRAME_OANDA_FORMATS[self]
     
     @property
     def description(self) -> str:
         """Возвращает описание таймфрейма"""
-        return {
-            Timeframe.M5: "5 минут",
-            Timeframe.M15: "15 минут",
-            Timeframe.M30: "30 минут",
-            Timeframe.H1: "1 час",
-            Timeframe.H4: "4 часа",
-            Timeframe.D1: "1 день",
-        }[self]
+        return _TIMEFRAME_DESCRIPTIONS[self]
+
+
+# Таблицы свойств таймфреймов строятся один раз при импорте,
+# а не при каждом обращении к свойству
+_TIMEFRAME_MINUTES: Dict[Timeframe, int] = {
+    Timeframe.M5: 5,
+    Timeframe.M15: 15,
+    Timeframe.M30: 30,
+    Timeframe.H1: 60,
+    Timeframe.H4: 240,
+    Timeframe.D1: 1440,
+}
+
+_TIMEFRAME_SECONDS: Dict[Timeframe, int] = {
+    timeframe: minutes * 60 for timeframe, minutes in _TIMEFRAME_MINUTES.items()
+}
+
+_TIMEFRAME_IDS: Dict[Timeframe, int] = {
+    Timeframe.M5: 3,
+    Timeframe.M15: 4,
+    Timeframe.M30: 8,
+    Timeframe.H1: 5,
+    Timeframe.H4: 6,
+    Timeframe.D1: 7,
+}
+
+_TIMEFRAME_OANDA_FORMATS: Dict[Timeframe, str] = {
+    Timeframe.M5: "M5",
+    Timeframe.M15: "M15",
+    Timeframe.M30: "M30",
+    Timeframe.H1: "H1",
+    Timeframe.H4: "H4",
+    Timeframe.D1: "D",
+}
+
+_TIMEFRAME_DESCRIPTIONS: Dict[Timeframe, str] = {
+    Timeframe.M5: "5 минут",
+    Timeframe.M15: "15 минут",
+    Timeframe.M30: "30 минут",
+    Timeframe.H1: "1 час",
+    Timeframe.H4: "4 часа",
+    Timeframe.D1: "1 день",
+}
 
 
 class SystemStatus(Enum):
@@ -96,6 +116,9 @@ MT5_TIMEFRAME_MAPPING = {
     Timeframe.D1: 16408,  # mt5.TIMEFRAME_D1
 }
 
+# Максимум баров в одном запросе copy_rates_range (длинные периоды режутся на окна)
+MT5_MAX_BARS_PER_REQUEST = 50000
+
 # Стандартные торговые пары (в формате OANDA)
 STANDARD_CURRENCY_PAIRS = [
     'EUR_USD',
@@ -3,6 +3,7 @@ Configuration settings using Pydantic
 """
 
 import os
+from functools import cached_property
 from typing import List, Dict, Optional, Any, Union
 from datetime import time
 from pydantic import Field, field_validator
@@ -48,6 +49,8 @@ class Settings(BaseSettings):
     postgres_user: str = Field(default="postgres", env="POSTGRES_USER")
     postgres_password: Optional[str] = Field(default=None, env="POSTGRES_PASSWORD")
     postgres_timezone: str = Field(default="UTC", env="POSTGRES_TIMEZONE")
+    postgres_pool_min: int = Field(default=1, env="POSTGRES_POOL_MIN")
+    postgres_pool_max: int = Field(default=10, env="POSTGRES_POOL_MAX")
     
     # MetaTrader5
     mt5_login: Optional[int] = Field(default=None, env="MT5_LOGIN")
@@ -55,6 +58,7 @@ class Settings(BaseSettings):
     mt5_server: Optional[str] = Field(default=None, env="MT5_SERVER")
     mt5_terminal_path: Optional[str] = Field(default=None, env="MT5_TERMINAL_PATH")
     mt5_rate_limit_delay: float = Field(default=0.1, env="MT5_RATE_LIMIT_DELAY")
+    mt5_rate_limit_burst: int = Field(default=5, env="MT5_RATE_LIMIT_BURST")
     
     # Telegram
     telegram_token: Optional[str] = Field(default=None, env="TELEGRAM_TOKEN")
@@ -69,6 +73,12 @@ class Settings(BaseSettings):
         env="TELEGRAM_TOPICS"
     )
     telegram_retry_attempts: int = Field(default=3, env="TELEGRAM_RETRY_ATTEMPTS")
+    telegram_batch_enabled: bool = Field(default=False, env="TELEGRAM_BATCH_ENABLED")
+    telegram_batch_flush_interval: float = Field(default=3.0, env="TELEGRAM_BATCH_FLUSH_INTERVAL")
+    telegram_max_buffer_size: int = Field(default=1000, env="TELEGRAM_MAX_BUFFER_SIZE")
+    telegram_pool_maxsize: int = Field(default=32, env="TELEGRAM_POOL_MAXSIZE")
+    telegram_rate_limit: float = Field(default=1.0, env="TELEGRAM_RATE_LIMIT")
+    telegram_rate_limit_burst: int = Field(default=5, env="TELEGRAM_RATE_LIMIT_BURST")
     
     # Обновление данных
     update_interval: int = Field(default=60, env="UPDATE_INTERVAL")
@@ -120,7 +130,8 @@ class Settings(BaseSettings):
         return {
             'host': self.postgres_host, 'port': self.postgres_port,
             'database': self.postgres_db, 'user': self.postgres_user,
-            'password': self.postgres_password, 'timezone': self.postgres_timezone
+            'password': self.postgres_password, 'timezone': self.postgres_timezone,
+            'pool_min': self.postgres_pool_min, 'pool_max': self.postgres_pool_max
         }
     
     @property
@@ -128,14 +139,21 @@ class Settings(BaseSettings):
         return {
             'login': self.mt5_login, 'password': self.mt5_password,
             'server': self.mt5_server, 'terminal_path': self.mt5_terminal_path,
-            'rate_limit_delay': self.mt5_rate_limit_delay
+            'rate_limit_delay': self.mt5_rate_limit_delay,
+            'rate_limit_burst': self.mt5_rate_limit_burst
         }
     
     @property
     def telegram(self):
         return {
             'bot_token': self.telegram_token, 'chat_id': self.telegram_chat_id,
-            'topics': self.telegram_topics, 'retry_attempts': self.telegram_retry_attempts
+            'topics': self.telegram_topics, 'retry_attempts': self.telegram_retry_attempts,
+            'batch_enabled': self.telegram_batch_enabled,
+            'batch_flush_interval': self.telegram_batch_flush_interval,
+            'max_buffer_size': self.telegram_max_buffer_size,
+            'pool_maxsize': self.telegram_pool_maxsize,
+            'rate_limit': self.telegram_rate_limit,
+            'rate_limit_burst': self.telegram_rate_limit_burst
         }
     
     @property
@@ -178,9 +196,14 @@ class Settings(BaseSettings):
             'timezone': self.trading_timezone
         }
     
-    @property
+    @cached_property
     def currency_pairs(self) -> List[CurrencyPair]:
-        """Возвращает список торговых пар из стандартного списка"""
+        """
+        Возвращает список торговых пар из стандартного списка
+        
+        Список строится один раз на экземпляр настроек; присваивание
+        (например, фильтр пар из командной строки) заменяет кэш.
+        """
         # Маппинг символов на их ID в базе данных (можно вынести в конфигурацию)
         symbol_id_mapping = {
             'EUR_USD': 7,
@@ -229,7 +252,17 @@ class Settings(BaseSettings):
         
         return pairs
     
-    @property
+    @cached_property
+    def enabled_pairs(self) -> List[CurrencyPair]:
+        """
+        Включенные торговые пары
+        
+        Кэшируется при первом обращении, поэтому переопределять
+        currency_pairs нужно до первого чтения enabled_pairs.
+        """
+        return [p for p in self.currency_pairs if p.enabled]
+    
+    @cached_property
     def active_timeframes(self) -> List[Timeframe]:
         return [Timeframe.M5, Timeframe.M15, Timeframe.M30, Timeframe.H1, Timeframe.H4]
     
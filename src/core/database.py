@@ -4,8 +4,8 @@ Database manager for PostgreSQL
 
 import psycopg2
 from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
-from typing import List, Tuple, Optional, Dict, Any
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import Iterable, List, Tuple, Optional, Dict, Any
 from datetime import datetime
 import logging
 from contextlib import contextmanager
@@ -23,6 +23,125 @@ class DatabaseQueryError(Exception):
     pass
 
 
+# Временная таблица для COPY: живет в сессии соединения, очищается при commit.
+# seq - порядковый номер строки в пакете для выбора последней версии свечи
+_CANDLES_STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS candles_staging (
+        symbol_id integer,
+        timeframe_id integer,
+        "timestamp" timestamp with time zone,
+        open numeric(18,8),
+        high numeric(18,8),
+        low numeric(18,8),
+        close numeric(18,8),
+        volume numeric(18,8),
+        seq bigint
+    ) ON COMMIT DELETE ROWS
+"""
+
+_CANDLES_COPY_SQL = """
+    COPY candles_staging
+    (symbol_id, timeframe_id, "timestamp", open, high, low, close, volume, seq)
+    FROM STDIN
+"""
+
+# Из дубликатов свечи в пакете остается последняя строка, как в insert_candles_batch
+_CANDLES_UPSERT_FROM_STAGING_SQL = """
+    INSERT INTO market_data.candles 
+    (symbol_id, timeframe_id, timestamp, open, high, low, close, volume)
+    SELECT DISTINCT ON (symbol_id, timeframe_id, "timestamp")
+        symbol_id, timeframe_id, "timestamp", open, high, low, close, volume
+    FROM candles_staging
+    ORDER BY symbol_id, timeframe_id, "timestamp", seq DESC
+    ON CONFLICT (symbol_id, timeframe_id, timestamp) 
+    DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume
+"""
+
+
+# Многострочная вставка: VALUES собирается один раз на страницу строк
+_CANDLES_INSERT_SQL = """
+    INSERT INTO market_data.candles 
+    (symbol_id, timeframe_id, timestamp, open, high, low, close, volume)
+    VALUES %s
+    ON CONFLICT (symbol_id, timeframe_id, timestamp) 
+    DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume
+    RETURNING 1
+"""
+
+_CANDLES_VALUES_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s, %s)"
+
+# Строк в одном INSERT (ограничивает размер текста запроса)
+_INSERT_PAGE_SIZE = 1000
+
+
+# NULL в текстовом формате COPY
+_COPY_NULL = '\\N'
+
+
+def _copy_int(value: Any) -> str:
+    """Целое поле строки COPY (numpy int, Decimal и т.п. приводятся к int)"""
+    return _COPY_NULL if value is None else str(int(value))
+
+
+def _copy_float(value: Any) -> str:
+    """Вещественное поле строки COPY (Decimal и numpy float приводятся к float)"""
+    return _COPY_NULL if value is None else repr(float(value))
+
+
+def _copy_timestamp(value: Optional[datetime]) -> str:
+    """Поле времени строки COPY"""
+    return _COPY_NULL if value is None else value.isoformat()
+
+
+class _CopyRowsReader:
+    """
+    Файлоподобный объект для COPY FROM STDIN
+    
+    Кортежи свечей форматируются в строки текстового формата COPY по мере
+    чтения, поэтому весь пакет не материализуется в памяти. Последней
+    колонкой идет порядковый номер строки (seq во временной таблице).
+    """
+    
+    def __init__(self, rows: Iterable[Tuple]):
+        self._rows = iter(rows)
+        self._buffer = ''
+        self.row_count = 0
+    
+    def read(self, size: int = -1) -> str:
+        parts = [self._buffer]
+        length = len(self._buffer)
+        
+        for row in self._rows:
+            self.row_count += 1
+            line = '\t'.join((
+                _copy_int(row[0]), _copy_int(row[1]), _copy_timestamp(row[2]),
+                _copy_float(row[3]), _copy_float(row[4]), _copy_float(row[5]),
+                _copy_float(row[6]), _copy_int(row[7]),
+                str(self.row_count)
+            )) + '\n'
+            parts.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+        
+        data = ''.join(parts)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
 class DatabaseManager:
     """Менеджер подключений к базе данных PostgreSQL"""
     
@@ -40,18 +159,27 @@ class DatabaseManager:
     
     def _initialize_pool(self) -> None:
         """Инициализация пула соединений"""
+        minconn = self.config.get('pool_min', 1)
+        maxconn = self.config.get('pool_max', 10)
+        
         try:
-            # Уменьшаем размер пула для предотвращения исчерпания подключений
-            self.connection_pool = pool.SimpleConnectionPool(
-                minconn=1,      # Минимальное количество соединений
-                maxconn=10,     # Максимальное количество соединений (уменьшено с 50)
+            # Потокобезопасный пул: соединения используются из нескольких потоков
+            # (параллельная загрузка, поток записи), а открытые соединения
+            # переиспользуются между пакетами без повторного подключения
+            self.connection_pool = pool.ThreadedConnectionPool(
+                minconn=minconn,
+                maxconn=maxconn,
                 host=self.config['host'],
                 port=self.config['port'],
                 database=self.config['database'],
                 user=self.config['user'],
                 password=self.config['password']
             )
-            self.logger.info("Database connection pool initialized with maxconn=10")
+            self.logger.info(
+                "Database connection pool initialized",
+                minconn=minconn,
+                maxconn=maxconn
+            )
         except Exception as e:
             self.logger.error("Failed to initialize database connection pool", error=str(e))
             raise DatabaseConnectionError(f"Failed to initialize connection pool: {e}")
@@ -135,39 +263,126 @@ class DatabaseManager:
             )
             raise DatabaseQueryError(f"Failed to get last candle time: {e}")
     
-    def insert_candles_batch(self, candles_data: List[Tuple]) -> int:
+    def get_last_candle_times(
+        self,
+        pairs: Iterable[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], datetime]:
+        """
+        Время последней свечи для набора комбинаций одним запросом
+        
+        Для каждой пары выполняется индексный поиск последней свечи (LATERAL),
+        поэтому запрос не агрегирует всю историю, как GROUP BY с MAX.
+        
+        Args:
+            pairs: Пары (symbol_id, timeframe_id)
+        
+        Returns:
+            Словарь (symbol_id, timeframe_id) -> время последней свечи;
+            комбинации без данных в словарь не попадают
+        """
+        symbol_ids, timeframe_ids = [], []
+        for symbol_id, timeframe_id in pairs:
+            symbol_ids.append(symbol_id)
+            timeframe_ids.append(timeframe_id)
+        
+        if not symbol_ids:
+            return {}
+        
+        try:
+            with self.get_connection() as conn:
+                with self.get_cursor(conn) as cursor:
+                    query = """
+                        SELECT p.symbol_id, p.timeframe_id, c.timestamp
+                        FROM unnest(%s::integer[], %s::integer[]) AS p(symbol_id, timeframe_id)
+                        CROSS JOIN LATERAL (
+                            SELECT timestamp
+                            FROM market_data.candles
+                            WHERE symbol_id = p.symbol_id AND timeframe_id = p.timeframe_id
+                            ORDER BY timestamp DESC
+                            LIMIT 1
+                        ) AS c
+                    """
+                    cursor.execute(query, (symbol_ids, timeframe_ids))
+                    
+                    return {
+                        (row['symbol_id'], row['timeframe_id']): row['timestamp']
+                        for row in cursor.fetchall()
+                    }
+        
+        except Exception as e:
+            self.logger.error("Failed to get last candle times", pairs=len(symbol_ids), error=str(e))
+            raise DatabaseQueryError(f"Failed to get last candle times: {e}")
+    
+    def get_candles_coverage(
+        self,
+        symbol_ids: Iterable[int],
+        timeframe_ids: Iterable[int]
+    ) -> Dict[Tuple[int, int], Tuple[datetime, datetime]]:
+        """
+        Диапазоны времени загруженных свечей одним агрегирующим запросом
+        
+        Args:
+            symbol_ids: ID символов
+            timeframe_ids: ID таймфреймов
+            
+        Returns:
+            Словарь (symbol_id, timeframe_id) -> (первая свеча, последняя свеча);
+            комбинации без данных в словарь не попадают
+        """
+        try:
+            with self.get_connection() as conn:
+                with self.get_cursor(conn) as cursor:
+                    query = """
+                        SELECT symbol_id, timeframe_id,
+                               MIN(timestamp) AS first_time,
+                               MAX(timestamp) AS last_time
+                        FROM market_data.candles 
+                        WHERE symbol_id = ANY(%s) AND timeframe_id = ANY(%s)
+                        GROUP BY symbol_id, timeframe_id
+                    """
+                    cursor.execute(query, (list(symbol_ids), list(timeframe_ids)))
+                    
+                    return {
+                        (row['symbol_id'], row['timeframe_id']): (row['first_time'], row['last_time'])
+                        for row in cursor.fetchall()
+                    }
+                    
+        except Exception as e:
+            self.logger.error("Failed to get candles coverage", error=str(e))
+            raise DatabaseQueryError(f"Failed to get candles coverage: {e}")
+    
+    def insert_candles_batch(self, candles_data: Iterable[Tuple]) -> int:
         """
         Пакетная вставка свечей
         
         Args:
-            candles_data: Список кортежей с данными свечей
+            candles_data: Кортежи с данными свечей (список или генератор)
             
         Returns:
             Количество вставленных записей
         """
-        if not candles_data:
+        # Один INSERT не может обновить строку дважды - оставляем последнюю
+        # версию каждой свечи, как при построчной вставке
+        rows = list({row[:3]: row for row in candles_data}.values())
+        if not rows:
             return 0
         
         try:
             with self.get_connection() as conn:
                 with self.get_cursor(conn) as cursor:
-                    query = """
-                        INSERT INTO market_data.candles 
-                        (symbol_id, timeframe_id, timestamp, open, high, low, close, volume)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (symbol_id, timeframe_id, timestamp) 
-                        DO UPDATE SET
-                            open = EXCLUDED.open,
-                            high = EXCLUDED.high,
-                            low = EXCLUDED.low,
-                            close = EXCLUDED.close,
-                            volume = EXCLUDED.volume
-                    """
-                    
-                    cursor.executemany(query, candles_data)
+                    # Страница строк отправляется одним INSERT ... VALUES вместо
+                    # отдельного выполнения на каждую строку
+                    inserted = execute_values(
+                        cursor,
+                        _CANDLES_INSERT_SQL,
+                        rows,
+                        template=_CANDLES_VALUES_TEMPLATE,
+                        page_size=_INSERT_PAGE_SIZE,
+                        fetch=True
+                    )
                     conn.commit()
                     
-                    inserted_count = len(candles_data)
+                    inserted_count = len(inserted)
                     self.logger.debug(
                         "Candles batch inserted",
                         count=inserted_count
@@ -178,11 +393,59 @@ class DatabaseManager:
         except Exception as e:
             self.logger.error(
                 "Failed to insert candles batch",
-                count=len(candles_data),
                 error=str(e)
             )
             raise DatabaseQueryError(f"Failed to insert candles batch: {e}")
     
+    def copy_candles_batch(self, candles_data: Iterable[Tuple]) -> int:
+        """
+        Массовая вставка свечей через COPY
+        
+        Строки загружаются COPY во временную таблицу и переносятся в
+        market_data.candles одним INSERT ... ON CONFLICT. Для больших
+        исторических загрузок это значительно быстрее построчного executemany.
+        
+        Args:
+            candles_data: Кортежи с данными свечей в порядке колонок
+                (symbol_id, timeframe_id, timestamp, open, high, low, close, volume)
+            
+        Returns:
+            Количество вставленных/обновленных записей
+        """
+        if isinstance(candles_data, (list, tuple)) and not candles_data:
+            return 0
+        
+        reader = _CopyRowsReader(candles_data)
+        
+        try:
+            with self.get_connection() as conn:
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute(_CANDLES_STAGING_DDL)
+                        cursor.copy_expert(_CANDLES_COPY_SQL, reader)
+                        cursor.execute(_CANDLES_UPSERT_FROM_STAGING_SQL)
+                        inserted_count = cursor.rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                
+                self.logger.debug(
+                    "Candles batch copied",
+                    rows=reader.row_count,
+                    count=inserted_count
+                )
+                
+                return inserted_count
+                
+        except Exception as e:
+            self.logger.error(
+                "Failed to copy candles batch",
+                rows=reader.row_count,
+                error=str(e)
+            )
+            raise DatabaseQueryError(f"Failed to copy candles batch: {e}")
+    
     def get_candles_count(self, symbol_id: int, timeframe_id: int) -> int:
         """
         Получение количества свечей для пары и таймфрейма
@@ -3,13 +3,22 @@ MetaTrader5 client for data fetching
 """
 
 import MetaTrader5 as mt5
+import numpy as np
 import threading
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
 
-from ..config.constants import Timeframe, MT5_TIMEFRAME_MAPPING, STANDARD_CURRENCY_PAIRS, generate_mt5_symbol_variants
+from ..config.constants import (
+    Timeframe, MT5_TIMEFRAME_MAPPING, MT5_MAX_BARS_PER_REQUEST,
+    STANDARD_CURRENCY_PAIRS, generate_mt5_symbol_variants
+)
 from ..utils.logging import get_logger
+from ..utils.rate_limiter import TokenBucket
+
+
+# Начало эпохи Unix: время баров MT5 задается в секундах от этой точки
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 
 class MT5ConnectionError(Exception):
@@ -22,9 +31,9 @@ class MT5QueryError(Exception):
     pass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MT5Candle:
-    """Свеча MT5"""
+    """Свеча MT5 (неизменяемая, без __dict__ для экономии памяти)"""
     symbol: str
     timeframe: Timeframe
     timestamp: datetime
@@ -49,6 +58,9 @@ class MT5Client:
         self.logger = get_logger(__name__)
         self._lock = threading.Lock()
         self._symbol_mapping = {}
+        self._selected_symbols = set()
+        self._stop_event = threading.Event()
+        self._rate_limiter = self._create_rate_limiter()
         self._initialize()
     
     def _initialize(self) -> None:
@@ -72,6 +84,17 @@ class MT5Client:
             self.logger.error("Failed to initialize MT5 client", error=str(e))
             raise MT5ConnectionError(f"MT5 initialization failed: {e}")
     
+    def _create_rate_limiter(self) -> Optional[TokenBucket]:
+        """Создание ограничителя частоты запросов к терминалу"""
+        rate_limit_delay = self.config.get('rate_limit_delay') or 0
+        if rate_limit_delay <= 0:
+            return None
+        
+        return TokenBucket(
+            rate=1 / rate_limit_delay,
+            capacity=self.config.get('rate_limit_burst', 1)
+        )
+    
     def _create_symbol_mapping(self) -> None:
         """Создание маппинга символов OANDA -> MT5"""
         self._symbol_mapping = {}
@@ -93,6 +116,13 @@ class MT5Client:
         self.logger.info(f"Created {len(self._symbol_mapping)} symbol mappings")
         for oanda_symbol, mt5_symbol in self._symbol_mapping.items():
             self.logger.debug(f"  {oanda_symbol} -> {mt5_symbol}")
+        
+        # Выбираем все найденные символы сразу, пока идет инициализация
+        self._selected_symbols = set()
+        for mt5_symbol in set(self._symbol_mapping.values()):
+            if self.ensure_symbol_selected(mt5_symbol):
+                self._selected_symbols.add(mt5_symbol)
+        self.logger.info(f"Selected {len(self._selected_symbols)} symbols in Market Watch")
     
     def _find_mt5_symbol(self, oanda_symbol: str, available_symbols: list) -> str:
         """
@@ -191,57 +221,248 @@ class MT5Client:
         Returns:
             Список свечей
         """
+        try:
+            rates = self.fetch_rates(symbol, timeframe, from_time, to_time, count)
+            
+            if len(rates) == 0:
+                self.logger.warning(f"No candles received for {symbol} {timeframe.value}")
+                return []
+            
+            # Конвертируем в наши объекты (вне блокировки): колонки извлекаются
+            # заранее, список собирается включением без повторных расширений
+            candles = [
+                MT5Candle(symbol, timeframe, timestamp, open_, high, low, close, volume)
+                for timestamp, open_, high, low, close, volume in zip(
+                    self.rates_to_datetimes(rates),
+                    rates['open'].tolist(),
+                    rates['high'].tolist(),
+                    rates['low'].tolist(),
+                    rates['close'].tolist(),
+                    rates['tick_volume'].tolist()
+                )
+            ]
+            
+            self.logger.debug(
+                f"Fetched {len(candles)} candles for {symbol} {timeframe.value}"
+            )
+            
+            return candles
+            
+        except Exception as e:
+            self.logger.error(
+                f"Failed to fetch candles for {symbol} {timeframe.value}",
+                error=str(e)
+            )
+            raise MT5QueryError(f"Failed to fetch candles: {e}")
+    
+    def fetch_rates(
+        self,
+        symbol: str,
+        timeframe: Timeframe,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        count: int = 1000
+    ) -> np.ndarray:
+        """
+        Загрузка сырых баров MT5 без создания объектов MT5Candle
+        
+        Для массовой обработки: колонки структурированного массива
+        (time, open, high, low, close, tick_volume, ...) обрабатываются
+        векторно, без построчной работы в Python. Поле time содержит
+        секунды UTC от начала эпохи.
+        
+        Args:
+            symbol: Символ валютной пары
+            timeframe: Таймфрейм
+            from_time: Время начала (если None, загружаем последние count свечей)
+            to_time: Время окончания (если None, используется текущее время)
+            count: Количество свечей для загрузки
+            
+        Returns:
+            Структурированный массив баров (пустой, если данных нет)
+        """
+        mt5_symbol = self._get_mt5_symbol(symbol)
+        
+        # Под блокировкой выполняются только обращения к терминалу
+        rates = self._copy_rates(mt5_symbol, timeframe, from_time, to_time, count)
+        
+        if rates is None:
+            return np.empty(0)
+        return rates
+    
+    @staticmethod
+    def rates_to_datetimes(rates) -> List[datetime]:
+        """
+        Векторная конвертация колонки time в UTC datetime
+        
+        Секунды переводятся в timedelta средствами numpy, после чего
+        прибавляются к началу эпохи одной операцией над массивом, без
+        вызова datetime.fromtimestamp на каждую строку.
+        """
+        offsets = rates['time'].astype('timedelta64[s]').astype(object)
+        return (_EPOCH + offsets).tolist()
+    
+    def _copy_rates(
+        self,
+        mt5_symbol: str,
+        timeframe: Timeframe,
+        from_time: Optional[datetime],
+        to_time: Optional[datetime],
+        count: int
+    ):
+        """
+        Запрос сырых баров у терминала MT5
+        
+        Длинные периоды запрашиваются окнами не более MT5_MAX_BARS_PER_REQUEST
+        баров: на многолетних диапазонах copy_rates_range иначе обрезает
+        результат или возвращает None.
+        """
+        mt5_timeframe = self._get_mt5_timeframe(timeframe)
+        
+        if from_time is None:
+            # Загружаем последние свечи
+            return self._terminal_call(
+                mt5_symbol, mt5.copy_rates_from_pos, mt5_symbol, mt5_timeframe, 0, count
+            )
+        
+        # Загружаем свечи за период
+        if to_time is None:
+            to_time = datetime.now(timezone.utc)
+        if from_time.tzinfo is None:
+            from_time = from_time.replace(tzinfo=timezone.utc)
+        if to_time.tzinfo is None:
+            to_time = to_time.replace(tzinfo=timezone.utc)
+        
+        chunks = list(self._iter_range_windows(mt5_symbol, timeframe, from_time, to_time))
+        
+        if not chunks:
+            return None
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+    
+    def iter_rates(
+        self,
+        symbol: str,
+        timeframe: Timeframe,
+        from_time: datetime,
+        to_time: Optional[datetime] = None
+    ) -> Iterator[np.ndarray]:
+        """
+        Потоковая загрузка сырых баров за период окнами MT5_MAX_BARS_PER_REQUEST
+        
+        В отличие от fetch_rates, окна не склеиваются: каждое можно обработать
+        и отправить на запись, пока загружается следующее, а в памяти
+        одновременно находится только одно окно. Окна не пересекаются и
+        идут по возрастанию времени. Ошибка терминала на любом окне
+        прерывает загрузку исключением MT5QueryError.
+        
+        Args:
+            symbol: Символ валютной пары
+            timeframe: Таймфрейм
+            from_time: Время начала
+            to_time: Время окончания (если None, используется текущее время)
+            
+        Yields:
+            Непустые структурированные массивы баров
+        """
+        mt5_symbol = self._get_mt5_symbol(symbol)
+        
+        if to_time is None:
+            to_time = datetime.now(timezone.utc)
+        if from_time.tzinfo is None:
+            from_time = from_time.replace(tzinfo=timezone.utc)
+        if to_time.tzinfo is None:
+            to_time = to_time.replace(tzinfo=timezone.utc)
+        
+        yield from self._iter_range_windows(mt5_symbol, timeframe, from_time, to_time)
+    
+    def _iter_range_windows(
+        self,
+        mt5_symbol: str,
+        timeframe: Timeframe,
+        from_time: datetime,
+        to_time: datetime
+    ) -> Iterator[np.ndarray]:
+        """Запрос периода у терминала последовательными окнами"""
+        mt5_timeframe = self._get_mt5_timeframe(timeframe)
+        window = timedelta(minutes=timeframe.minutes * MT5_MAX_BARS_PER_REQUEST)
+        window_start = from_time
+        
+        while window_start <= to_time:
+            window_end = min(window_start + window, to_time)
+            rates = self._terminal_call(
+                mt5_symbol, mt5.copy_rates_range, mt5_symbol, mt5_timeframe, window_start, window_end
+            )
+            if rates is None:
+                # None - ошибка терминала (окно без баров возвращается пустым массивом);
+                # пропуск окна оставил бы в данных дыру посреди периода
+                raise MT5QueryError(
+                    f"Failed to fetch {mt5_symbol} {timeframe.value} "
+                    f"{window_start.isoformat()} - {window_end.isoformat()}: {mt5.last_error()}"
+                )
+            if len(rates) > 0:
+                yield rates
+            # Границы окон включительные, следующее окно начинаем через секунду
+            window_start = window_end + timedelta(seconds=1)
+    
+    def _terminal_call(self, mt5_symbol: str, func, *args):
+        """
+        Вызов функции терминала MT5 для символа
+        
+        Модуль MetaTrader5 держит одно соединение с терминалом на процесс,
+        поэтому вызовы сериализуются через self._lock. Блокировка удерживается
+        только на время IPC, разбор результата выполняется без неё.
+        """
+        # Ждем токен до захвата блокировки, чтобы не держать её во время паузы;
+        # ожидание прерывается при закрытии клиента
+        if self._rate_limiter is not None:
+            if not self._rate_limiter.acquire(stop_event=self._stop_event):
+                raise MT5QueryError("MT5 client is shutting down")
+        
         with self._lock:
-            try:
-                mt5_symbol = self._get_mt5_symbol(symbol)
-                mt5_timeframe = self._get_mt5_timeframe(timeframe)
-                
-                # Убеждаемся что символ выбран
+            # Убеждаемся что символ выбран (выбранные при инициализации не проверяем)
+            if mt5_symbol not in self._selected_symbols:
                 if not self.ensure_symbol_selected(mt5_symbol):
                     raise MT5QueryError(f"Symbol {mt5_symbol} not available")
+                self._selected_symbols.add(mt5_symbol)
+            
+            result = func(*args)
+            if result is None:
+                # Символ могли убрать из Market Watch, перепроверим при следующем вызове
+                self._selected_symbols.discard(mt5_symbol)
                 
-                # Определяем параметры запроса
-                if from_time is None:
-                    # Загружаем последние свечи
-                    rates = mt5.copy_rates_from_pos(mt5_symbol, mt5_timeframe, 0, count)
-                else:
-                    # Загружаем свечи за период
-                    if to_time is None:
-                        to_time = datetime.now(timezone.utc)
-                    
-                    rates = mt5.copy_rates_range(mt5_symbol, mt5_timeframe, from_time, to_time)
-                
-                if rates is None or len(rates) == 0:
-                    self.logger.warning(f"No candles received for {symbol} {timeframe.value}")
-                    return []
-                
-                # Конвертируем в наши объекты
-                candles = []
-                for rate in rates:
-                    candle = MT5Candle(
-                        symbol=symbol,
-                        timeframe=timeframe,
-                        timestamp=datetime.fromtimestamp(rate['time'], tz=timezone.utc),
-                        open=float(rate['open']),
-                        high=float(rate['high']),
-                        low=float(rate['low']),
-                        close=float(rate['close']),
-                        volume=int(rate['tick_volume'])
-                    )
-                    candles.append(candle)
-                
-                self.logger.debug(
-                    f"Fetched {len(candles)} candles for {symbol} {timeframe.value}"
-                )
-                
-                return candles
-                
-            except Exception as e:
-                self.logger.error(
-                    f"Failed to fetch candles for {symbol} {timeframe.value}",
-                    error=str(e)
-                )
-                raise MT5QueryError(f"Failed to fetch candles: {e}")
+                # Терминал потерял соединение: переподключаемся один раз под блокировкой,
+                # остальные потоки дождутся её и работают уже с восстановленной сессией
+                if mt5.terminal_info() is None and self._reconnect():
+                    if self.ensure_symbol_selected(mt5_symbol):
+                        self._selected_symbols.add(mt5_symbol)
+                        result = func(*args)
+            return result
+    
+    def _reconnect(self) -> bool:
+        """
+        Повторная инициализация терминала (вызывается под self._lock)
+        
+        Returns:
+            True если соединение восстановлено
+        """
+        if self._stop_event.is_set():
+            return False
+        
+        self.logger.warning("MT5 terminal connection lost, reinitializing", error=str(mt5.last_error()))
+        
+        if not mt5.initialize(
+            path=self.config.get('terminal_path'),
+            login=self.config.get('login'),
+            password=self.config.get('password'),
+            server=self.config.get('server')
+        ):
+            self.logger.error("MT5 reinitialization failed", error=str(mt5.last_error()))
+            return False
+        
+        # После переподключения Market Watch мог измениться
+        self._selected_symbols.clear()
+        self.logger.info("MT5 terminal reconnected")
+        return True
     
     def fetch_latest_candles(
         self, 
@@ -346,6 +567,8 @@ class MT5Client:
     
     def _shutdown(self) -> None:
         """Завершение работы MT5"""
+        # Будим потоки, ожидающие ограничителя частоты
+        self._stop_event.set()
         try:
             mt5.shutdown()
             self.logger.info("MT5 client shutdown")
@@ -2,12 +2,142 @@
 Telegram notification system
 """
 
+import orjson
+import queue
 import requests
-import time
-from typing import Dict, Any, Optional
-from urllib.parse import urljoin
+import socket
+import threading
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, List, Optional
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
 
 from ..utils.logging import get_logger
+from ..utils.rate_limiter import TokenBucket
+
+
+# Количество потоков для фоновой отправки сообщений
+_SEND_WORKERS = 4
+
+# Тело запроса кодируется orjson и передается как data, тип указываем явно
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Сколько секунд close() ждет финальной отправки очереди
+_CLOSE_TIMEOUT = 10.0
+
+# Лимит длины сообщения Telegram и размер пакета с запасом под него
+_MAX_MESSAGE_LENGTH = 4096
+_BATCH_MESSAGE_LENGTH = 4000
+_BATCH_SEPARATOR = "\n\n"
+
+# TCP keepalive для соединений пула: (опция, значение) - idle 30s, интервал 10s, 3 пробы.
+# Опции, отсутствующие на платформе, пропускаются
+_KEEPALIVE_SOCKET_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)] + [
+    (socket.IPPROTO_TCP, getattr(socket, name), value)
+    for name, value in (('TCP_KEEPIDLE', 30), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3))
+    if hasattr(socket, name)
+]
+
+# Общие фрагменты шаблонов
+_TIMESTAMP_LINE = "🕐 {timestamp}"
+_UPTIME_LINE = "⏱️ Время работы: {uptime}"
+_CYCLES_LINES = "🔄 Циклов: {cycles}\n✅ Успешных: {successful_cycles}"
+
+# Шаблоны уведомлений (собираются один раз при импорте,
+# заполняются через str.format_map)
+_SYSTEM_START_TEMPLATE = "\n".join((
+    "🚀 <b>Система запущена</b>",
+    "🕐 {start_time}",
+    "💱 Пар: {pairs}",
+    "📊 Таймфреймы: {timeframes}",
+    "🔢 Комбинаций: {combinations_count}",
+    "⚡ Режим: {mode}",
+))
+
+_SYSTEM_STOP_TEMPLATE = "\n".join((
+    "🛑 <b>Система остановлена</b>",
+    "🕐 {stop_time}",
+    _UPTIME_LINE,
+    _CYCLES_LINES,
+    "💾 Свечей: {candles_count}",
+    "❌ Ошибок: {errors_count}",
+))
+
+_ERROR_TEMPLATE = "\n".join((
+    "❌ <b>Ошибка системы</b>",
+    _TIMESTAMP_LINE,
+    "🔧 Компонент: {component}",
+    "📝 Тип: {error_type}",
+    "💬 Сообщение: {message}",
+))
+
+_HEARTBEAT_TEMPLATE = "\n".join((
+    "💓 <b>Heartbeat</b>",
+    _TIMESTAMP_LINE,
+    _UPTIME_LINE,
+    _CYCLES_LINES,
+    "💾 Свечей за час: {candles_last_hour}",
+    "💱 Активных пар: {active_pairs}",
+))
+
+_UPDATE_TEMPLATE = "\n".join((
+    "📈 <b>Обновление данных</b>",
+    _TIMESTAMP_LINE,
+    "⏱️ Длительность: {duration}",
+    "💾 Новых свечей: {new_candles}",
+    "✅ Успешных пар: {successful_pairs}",
+    "❌ Ошибок: {errors}",
+))
+
+_TRADE_TEMPLATE = "\n".join((
+    "💰 <b>Сделка {action}</b>",
+    "💱 {symbol}",
+    "📊 Объем: {volume}",
+    "💵 Цена: {price}",
+    "📈 Прибыль: {profit}",
+    _TIMESTAMP_LINE,
+))
+
+_ANALYSIS_TEMPLATE = "\n".join((
+    "📊 <b>Анализ рынка</b>",
+    "💱 {symbol}",
+    "📈 Сигнал: {signal}",
+    "💪 Сила: {strength}",
+    "📝 Описание: {description}",
+    _TIMESTAMP_LINE,
+))
+
+
+def _safe_cut(text: str) -> int:
+    """
+    Позиция разреза строки HTML сообщения
+    
+    Разрез допустим только вне тегов и сущностей и при закрытых тегах
+    (Telegram отклоняет незакрытый тег); по возможности - после пробела.
+    """
+    depth = 0
+    last_safe = last_space = 0
+    i = 0
+    
+    while i < len(text):
+        char = text[i]
+        if char in '<&':
+            end = text.find('>' if char == '<' else ';', i)
+            if end < 0:
+                break
+            if char == '<':
+                depth += -1 if text.startswith('</', i) else 1
+            i = end + 1
+        else:
+            i += 1
+            if depth == 0 and char == ' ':
+                last_space = i
+        if depth == 0:
+            last_safe = i
+    
+    return last_space or last_safe or len(text)
 
 
 class TelegramNotificationError(Exception):
@@ -15,6 +145,29 @@ class TelegramNotificationError(Exception):
     pass
 
 
+class TelegramRateLimitError(TelegramNotificationError):
+    """Telegram ограничил частоту запросов (HTTP 429)"""
+    
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TelegramClosingError(TelegramNotificationError):
+    """Уведомитель закрывается, лимит отправки исчерпан - сообщение не отправлено"""
+    pass
+
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter с TCP keepalive на сокетах пула соединений"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = (
+            HTTPConnection.default_socket_options + _KEEPALIVE_SOCKET_OPTIONS
+        )
+        super().init_poolmanager(*args, **kwargs)
+
+
 class TelegramNotifier:
     """Отправка уведомлений в Telegram"""
     
@@ -28,35 +181,135 @@ class TelegramNotifier:
         self.config = config
         self.logger = get_logger(__name__)
         self.base_url = "https://api.telegram.org/bot{}/".format(config.get('bot_token', ''))
+        self._send_url = self.base_url + "sendMessage"
+        self._getme_url = self.base_url + "getMe"
         self.chat_id = config.get('chat_id')
         self.topics = config.get('topics', {})
         self.retry_attempts = config.get('retry_attempts', 3)
+        self._enabled = bool(config.get('bot_token') and self.chat_id)
+        if not self._enabled:
+            self.logger.warning("Telegram not configured, messages will be skipped")
         self.session = self._create_session()
+        self._rate_limiter = self._create_rate_limiter()
+        self._executor = ThreadPoolExecutor(
+            max_workers=_SEND_WORKERS,
+            thread_name_prefix='telegram'
+        )
+        
+        # Пакетная отправка: сообщения копятся в очереди и уходят фоновым потоком
+        self.batch_enabled = self._enabled and config.get('batch_enabled', False)
+        self.batch_flush_interval = config.get('batch_flush_interval', 3.0)
+        self._queue = queue.Queue(maxsize=config.get('max_buffer_size', 1000))
+        self._stop_event = threading.Event()
+        self._flush_thread = None
+        if self.batch_enabled:
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop,
+                name='telegram-flush',
+                daemon=True
+            )
+            self._flush_thread.start()
     
     def _create_session(self) -> requests.Session:
         """Создание HTTP сессии с retry логикой"""
         session = requests.Session()
         session.headers.update({
-            'Content-Type': 'application/json',
             'User-Agent': 'TradingSystem/1.0'
         })
+        
+        # Повторы выполняются на уровне транспорта с переиспользованием TLS соединения
+        retry = self._create_retry()
+        # Keepalive пробы не дают NAT/фаерволу молча закрыть простаивающее соединение
+        adapter = KeepAliveHTTPAdapter(
+            max_retries=retry,
+            pool_connections=4,
+            pool_maxsize=self.config.get('pool_maxsize', 32),
+            pool_block=False
+        )
+        session.mount('https://', adapter)
+        
         return session
     
+    def _create_rate_limiter(self) -> Optional[TokenBucket]:
+        """
+        Создание ограничителя частоты отправки в чат
+        
+        Telegram допускает около одного сообщения в секунду на чат; запросы
+        сверх лимита получают 429, поэтому поток сглаживается заранее.
+        """
+        rate_limit = self.config.get('rate_limit') or 0
+        if rate_limit <= 0:
+            return None
+        
+        return TokenBucket(
+            rate=rate_limit,
+            capacity=self.config.get('rate_limit_burst', 1)
+        )
+    
+    def _create_retry(self) -> Retry:
+        """
+        Создание стратегии повторов urllib3
+        
+        sendMessage не идемпотентен: ошибка чтения или 5xx не гарантирует,
+        что сообщение не было доставлено, поэтому POST повторяется только
+        при ошибке соединения и на 429 (с учетом Retry-After).
+        Задержка экспоненциальная со случайной добавкой, не более 30s.
+        """
+        attempts = max(self.retry_attempts - 1, 0)
+        return Retry(
+            total=attempts,
+            connect=attempts,
+            read=0,
+            status=attempts,
+            other=0,
+            status_forcelist=(429,),
+            allowed_methods=frozenset(['HEAD', 'GET', 'POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            backoff_factor=1,
+            backoff_jitter=0.5,
+            backoff_max=30
+        )
+    
     def send_message(self, message: str, topic: str = "system") -> bool:
         """
         Отправка сообщения в Telegram
         
+        При включенной пакетной отправке сообщение ставится в очередь и
+        уходит вместе с другими сообщениями того же топика.
+        
         Args:
             message: Текст сообщения
             topic: Тема сообщения (system, trades, analysis, etc.)
             
         Returns:
-            True если сообщение отправлено успешно
+            True если сообщение отправлено (или поставлено в очередь) успешно
         """
-        if not self.config.get('bot_token') or not self.chat_id:
-            self.logger.warning("Telegram not configured, skipping message")
+        if not self._enabled:
             return False
         
+        if self.batch_enabled:
+            try:
+                self._queue.put_nowait((topic, message))
+                return True
+            except queue.Full:
+                # Очередь переполнена - отправляем в пуле потоков, не блокируя вызывающего
+                self.logger.warning("Telegram buffer is full, sending in background", topic=topic)
+                self._executor.submit(self._post_message, message, topic)
+                return True
+        
+        return self._post_message(message, topic)
+    
+    def _post_message(self, message: str, topic: str) -> bool:
+        """Отправка одного сообщения запросом sendMessage"""
+        # Ждем разрешения лимитера. При закрытии ожидание прерывается, но
+        # сообщения в пределах запаса токенов отправляются: сверх него
+        # всплеск при остановке получил бы 429
+        if self._rate_limiter is not None:
+            if not self._rate_limiter.acquire(stop_event=self._stop_event):
+                self.logger.warning("Telegram message not sent, notifier is closing", topic=topic)
+                raise TelegramClosingError("Telegram notifier is closing")
+        
         try:
             # Определяем thread_id для топика
             thread_id = self.topics.get(topic, None)
@@ -71,32 +324,35 @@ class TelegramNotifier:
             if thread_id:
                 params['message_thread_id'] = thread_id
             
-            # Отправка с retry логикой
-            for attempt in range(self.retry_attempts):
-                try:
-                    response = self.session.post(
-                        urljoin(self.base_url, "sendMessage"),
-                        json=params,
-                        timeout=10
-                    )
-                    response.raise_for_status()
-                    
-                    self.logger.debug(
-                        "Message sent successfully",
-                        topic=topic,
-                        message_length=len(message)
-                    )
-                    return True
-                    
-                except requests.exceptions.RequestException as e:
-                    if attempt < self.retry_attempts - 1:
-                        self.logger.warning(
-                            f"Failed to send message (attempt {attempt + 1}/{self.retry_attempts})",
-                            error=str(e)
-                        )
-                        time.sleep(2 ** attempt)  # Экспоненциальная задержка
-                    else:
-                        raise
+            # Повторы при ошибках выполняет HTTPAdapter сессии
+            response = self.session.post(
+                self._send_url,
+                data=orjson.dumps(params),
+                headers=_JSON_HEADERS,
+                timeout=10
+            )
+            if response.status_code == 429:
+                # Повторы адаптера исчерпаны - сообщаем, сколько ждать
+                raise TelegramRateLimitError(
+                    "Telegram rate limit exceeded",
+                    self._get_retry_after(response)
+                )
+            response.raise_for_status()
+            
+            self.logger.debug(
+                "Message sent successfully",
+                topic=topic,
+                message_length=len(message)
+            )
+            return True
+            
+        except TelegramRateLimitError as e:
+            self.logger.warning(
+                "Telegram rate limit exceeded",
+                topic=topic,
+                retry_after=e.retry_after
+            )
+            raise
             
         except Exception as e:
             self.logger.error(
@@ -106,99 +362,191 @@ class TelegramNotifier:
             )
             raise TelegramNotificationError(f"Failed to send message: {e}")
     
+    @staticmethod
+    def _get_retry_after(response: requests.Response) -> float:
+        """Время ожидания из ответа 429 (parameters.retry_after или Retry-After)"""
+        try:
+            return float(response.json()['parameters']['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            pass
+        try:
+            return float(response.headers.get('Retry-After', 1))
+        except ValueError:
+            return 1.0
+    
+    def _flush_loop(self) -> None:
+        """Фоновый цикл периодической отправки накопленных сообщений"""
+        while not self._stop_event.wait(self.batch_flush_interval):
+            self.flush()
+        # Финальная отправка при остановке
+        self.flush()
+    
+    def flush(self) -> None:
+        """Отправка всех накопленных сообщений, сгруппированных по топикам"""
+        pending: Dict[str, List[str]] = {}
+        while True:
+            try:
+                topic, message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            pending.setdefault(topic, []).append(message)
+        
+        retry_after = None
+        stopped = False
+        for topic, messages in pending.items():
+            for text in self._pack_messages(messages):
+                if stopped:
+                    # После 429 или при закрытии остаток возвращаем в очередь
+                    self._requeue(topic, text)
+                    continue
+                try:
+                    self._post_message(text, topic)
+                except TelegramRateLimitError as e:
+                    retry_after = e.retry_after
+                    stopped = True
+                    self._requeue(topic, text)
+                except TelegramClosingError:
+                    stopped = True
+                    self._requeue(topic, text)
+                except TelegramNotificationError:
+                    # Ошибка уже залогирована, продолжаем с остальными пакетами
+                    pass
+        
+        if retry_after is not None:
+            # Ждем, сколько просит Telegram (прерывается при остановке)
+            self._stop_event.wait(retry_after)
+    
+    def _requeue(self, topic: str, message: str) -> None:
+        """Возврат неотправленного сообщения в очередь"""
+        try:
+            self._queue.put_nowait((topic, message))
+        except queue.Full:
+            self.logger.warning("Telegram buffer is full, message dropped", topic=topic)
+    
+    @staticmethod
+    def _pack_messages(messages: List[str]) -> Iterator[str]:
+        """
+        Объединение сообщений в пакеты не длиннее _BATCH_MESSAGE_LENGTH
+        
+        Сообщение длиннее лимита Telegram делится _split_message.
+        """
+        batch: List[str] = []
+        batch_length = 0
+        separator_length = len(_BATCH_SEPARATOR)
+        
+        for message in messages:
+            if len(message) > _MAX_MESSAGE_LENGTH:
+                if batch:
+                    yield _BATCH_SEPARATOR.join(batch)
+                    batch, batch_length = [], 0
+                yield from TelegramNotifier._split_message(message)
+                continue
+            
+            added_length = len(message) + (separator_length if batch else 0)
+            if batch and batch_length + added_length > _BATCH_MESSAGE_LENGTH:
+                yield _BATCH_SEPARATOR.join(batch)
+                batch, batch_length = [], 0
+                added_length = len(message)
+            
+            batch.append(message)
+            batch_length += added_length
+        
+        if batch:
+            yield _BATCH_SEPARATOR.join(batch)
+    
+    @staticmethod
+    def _split_message(message: str) -> Iterator[str]:
+        """
+        Деление сообщения на части не длиннее _MAX_MESSAGE_LENGTH
+        
+        Сообщения отправляются с parse_mode=HTML, поэтому разрез внутри тега
+        или сущности (&amp;) Telegram отклонит. Режем по последнему переводу
+        строки (теги шаблонов не переходят через строку), а если его нет - по
+        пробелу или границе вне тега и сущности.
+        """
+        while len(message) > _MAX_MESSAGE_LENGTH:
+            window = message[:_MAX_MESSAGE_LENGTH]
+            cut = window.rfind('\n') + 1
+            if cut == 0:
+                cut = _safe_cut(window)
+            yield message[:cut]
+            message = message[cut:]
+        if message:
+            yield message
+    
+    def send_message_async(self, message: str, topic: str = "system") -> Future:
+        """
+        Отправка сообщения в фоновом потоке
+        
+        Вызывающий поток не ждет HTTP запроса; несколько сообщений
+        отправляются параллельно через общий пул соединений сессии.
+        
+        Args:
+            message: Текст сообщения
+            topic: Тема сообщения
+            
+        Returns:
+            Future с результатом send_message
+        """
+        return self._executor.submit(self.send_message, message, topic)
+    
+    def send_message_nowait(self, message: str, topic: str = "system") -> bool:
+        """
+        Отправка уведомления без ожидания HTTP запроса
+        
+        При пакетной отправке сообщение ставится в очередь, иначе
+        отправляется в пуле потоков. Ошибки отправки логируются в send_message.
+        
+        Returns:
+            True если сообщение принято к отправке
+        """
+        if not self._enabled:
+            return False
+        if self.batch_enabled:
+            return self.send_message(message, topic)
+        self.send_message_async(message, topic)
+        return True
+    
+    def _render(self, template: str, info: Dict[str, Any]) -> str:
+        """Подстановка значений в шаблон сообщения ('N/A' для отсутствующих)"""
+        return template.format_map(defaultdict(lambda: 'N/A', info))
+    
     def send_system_start(self, system_info: Dict[str, Any]) -> bool:
         """Отправка уведомления о запуске системы"""
-        message = (
-            f"🚀 <b>Система запущена</b>\n"
-            f"🕐 {system_info.get('start_time', 'N/A')}\n"
-            f"💱 Пар: {system_info.get('pairs', 'N/A')}\n"
-            f"📊 Таймфреймы: {system_info.get('timeframes', 'N/A')}\n"
-            f"🔢 Комбинаций: {system_info.get('combinations_count', 'N/A')}\n"
-            f"⚡ Режим: {system_info.get('mode', 'N/A')}"
-        )
-        return self.send_message(message, "system")
+        return self.send_message_nowait(self._render(_SYSTEM_START_TEMPLATE, system_info), "system")
     
     def send_system_stop(self, system_info: Dict[str, Any]) -> bool:
         """Отправка уведомления об остановке системы"""
-        message = (
-            f"🛑 <b>Система остановлена</b>\n"
-            f"🕐 {system_info.get('stop_time', 'N/A')}\n"
-            f"⏱️ Время работы: {system_info.get('uptime', 'N/A')}\n"
-            f"🔄 Циклов: {system_info.get('cycles', 'N/A')}\n"
-            f"✅ Успешных: {system_info.get('successful_cycles', 'N/A')}\n"
-            f"💾 Свечей: {system_info.get('candles_count', 'N/A')}\n"
-            f"❌ Ошибок: {system_info.get('errors_count', 'N/A')}"
-        )
-        return self.send_message(message, "system")
+        return self.send_message_nowait(self._render(_SYSTEM_STOP_TEMPLATE, system_info), "system")
     
     def send_error_notification(self, error_info: Dict[str, Any]) -> bool:
         """Отправка уведомления об ошибке"""
-        message = (
-            f"❌ <b>Ошибка системы</b>\n"
-            f"🕐 {error_info.get('timestamp', 'N/A')}\n"
-            f"🔧 Компонент: {error_info.get('component', 'N/A')}\n"
-            f"📝 Тип: {error_info.get('error_type', 'N/A')}\n"
-            f"💬 Сообщение: {error_info.get('message', 'N/A')}"
-        )
-        return self.send_message(message, "system")
+        return self.send_message_nowait(self._render(_ERROR_TEMPLATE, error_info), "system")
     
     def send_heartbeat(self, stats: Dict[str, Any]) -> bool:
         """Отправка heartbeat уведомления"""
-        message = (
-            f"💓 <b>Heartbeat</b>\n"
-            f"🕐 {stats.get('timestamp', 'N/A')}\n"
-            f"⏱️ Время работы: {stats.get('uptime', 'N/A')}\n"
-            f"🔄 Циклов: {stats.get('cycles', 'N/A')}\n"
-            f"✅ Успешных: {stats.get('successful_cycles', 'N/A')}\n"
-            f"💾 Свечей за час: {stats.get('candles_last_hour', 'N/A')}\n"
-            f"💱 Активных пар: {stats.get('active_pairs', 'N/A')}"
-        )
-        return self.send_message(message, "system")
+        return self.send_message_nowait(self._render(_HEARTBEAT_TEMPLATE, stats), "system")
     
     def send_update_notification(self, update_info: Dict[str, Any]) -> bool:
         """Отправка уведомления об обновлении данных"""
-        message = (
-            f"📈 <b>Обновление данных</b>\n"
-            f"🕐 {update_info.get('timestamp', 'N/A')}\n"
-            f"⏱️ Длительность: {update_info.get('duration', 'N/A')}\n"
-            f"💾 Новых свечей: {update_info.get('new_candles', 'N/A')}\n"
-            f"✅ Успешных пар: {update_info.get('successful_pairs', 'N/A')}\n"
-            f"❌ Ошибок: {update_info.get('errors', 'N/A')}"
-        )
-        return self.send_message(message, "system")
+        return self.send_message_nowait(self._render(_UPDATE_TEMPLATE, update_info), "system")
     
     def send_trade_notification(self, trade_info: Dict[str, Any]) -> bool:
         """Отправка уведомления о сделке"""
-        message = (
-            f"💰 <b>Сделка {trade_info.get('action', 'N/A')}</b>\n"
-            f"💱 {trade_info.get('symbol', 'N/A')}\n"
-            f"📊 Объем: {trade_info.get('volume', 'N/A')}\n"
-            f"💵 Цена: {trade_info.get('price', 'N/A')}\n"
-            f"📈 Прибыль: {trade_info.get('profit', 'N/A')}\n"
-            f"🕐 {trade_info.get('timestamp', 'N/A')}"
-        )
-        return self.send_message(message, "trades")
+        return self.send_message_nowait(self._render(_TRADE_TEMPLATE, trade_info), "trades")
     
     def send_analysis_notification(self, analysis_info: Dict[str, Any]) -> bool:
         """Отправка уведомления об анализе"""
-        message = (
-            f"📊 <b>Анализ рынка</b>\n"
-            f"💱 {analysis_info.get('symbol', 'N/A')}\n"
-            f"📈 Сигнал: {analysis_info.get('signal', 'N/A')}\n"
-            f"💪 Сила: {analysis_info.get('strength', 'N/A')}\n"
-            f"📝 Описание: {analysis_info.get('description', 'N/A')}\n"
-            f"🕐 {analysis_info.get('timestamp', 'N/A')}"
-        )
-        return self.send_message(message, "analysis")
+        return self.send_message_nowait(self._render(_ANALYSIS_TEMPLATE, analysis_info), "analysis")
     
     def test_connection(self) -> bool:
         """Тестирование подключения к Telegram"""
         try:
-            if not self.config.get('bot_token') or not self.chat_id:
+            if not self._enabled:
                 return False
             
             response = self.session.get(
-                urljoin(self.base_url, "getMe"),
+                self._getme_url,
                 timeout=10
             )
             response.raise_for_status()
@@ -220,6 +568,24 @@ class TelegramNotifier:
     def close(self) -> None:
         """Закрытие HTTP сессии"""
         try:
+            # Останавливаем фоновую отправку (с финальным сбросом очереди)
+            self._stop_event.set()
+            if self._flush_thread is not None:
+                # Ожидание ограничено: повторы HTTP адаптера могут длиться минутами
+                self._flush_thread.join(timeout=_CLOSE_TIMEOUT)
+                if self._flush_thread.is_alive():
+                    self.logger.warning(
+                        "Telegram flush did not finish on close",
+                        timeout=_CLOSE_TIMEOUT
+                    )
+                if not self._queue.empty():
+                    self.logger.warning(
+                        "Telegram messages left unsent on close",
+                        count=self._queue.qsize()
+                    )
+            
+            # Дожидаемся отправки сообщений, поставленных в очередь
+            self._executor.shutdown(wait=True)
             self.session.close()
             self.logger.info("Telegram notifier session closed")
         except Exception as e:
@@ -2,18 +2,31 @@
 Candle data processing utilities
 """
 
-from typing import List, Tuple, Dict, Any
+import logging
+import numpy as np
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import repeat
+from operator import attrgetter
+from typing import List, Tuple, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime, timezone
 from dataclasses import dataclass
 
 from ..config.constants import Timeframe
-from ..core.mt5_client import MT5Candle
+from ..core.mt5_client import MT5Candle, MT5Client
 from ..utils.logging import get_logger
 
 
-@dataclass
+# Часовой пояс свечей и времени из БД
+_UTC = timezone.utc
+
+# Ключ сортировки свечей по времени
+_timestamp_key = attrgetter('timestamp')
+
+
+@dataclass(slots=True, frozen=True)
 class ProcessedCandle:
-    """Обработанная свеча для вставки в БД"""
+    """Обработанная свеча для вставки в БД (неизменяемая, без __dict__)"""
     symbol_id: int
     timeframe_id: int
     timestamp: datetime
@@ -29,6 +42,9 @@ class CandleProcessor:
     
     def __init__(self):
         self.logger = get_logger(__name__)
+        # Проверка уровня напрямую у stdlib логгера: отладочные записи на горячем
+        # пути не собираются, когда DEBUG выключен
+        self._stdlib_logger = logging.getLogger(__name__)
     
     def process_mt5_candles(
         self, 
@@ -45,23 +61,46 @@ class CandleProcessor:
         Returns:
             Список обработанных свечей
         """
+        symbol_id = int(symbol_id)
+        
+        try:
+            # Явная конвертация типов для совместимости с psycopg2
+            processed_candles = [
+                ProcessedCandle(
+                    symbol_id, int(candle.timeframe.id), candle.timestamp,
+                    float(candle.open), float(candle.high), float(candle.low),
+                    float(candle.close), int(candle.volume)
+                )
+                for candle in candles
+            ]
+        except Exception:
+            # Редкий случай битых данных: повторяем поштучно, пропуская плохие свечи
+            processed_candles = self._process_candles_skipping_errors(candles, symbol_id)
+        
+        if self._stdlib_logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Candles processed",
+                input_count=len(candles),
+                processed_count=len(processed_candles)
+            )
+        
+        return processed_candles
+    
+    def _process_candles_skipping_errors(
+        self,
+        candles: List[MT5Candle],
+        symbol_id: int
+    ) -> List[ProcessedCandle]:
+        """Поштучная обработка свечей с логированием и пропуском ошибочных"""
         processed_candles = []
         
         for candle in candles:
             try:
-                # Явная конвертация типов для совместимости с psycopg2
-                processed_candle = ProcessedCandle(
-                    symbol_id=int(symbol_id),
-                    timeframe_id=int(candle.timeframe.id),
-                    timestamp=candle.timestamp,
-                    open=float(candle.open),
-                    high=float(candle.high),
-                    low=float(candle.low),
-                    close=float(candle.close),
-                    volume=int(candle.volume)
-                )
-                processed_candles.append(processed_candle)
-                
+                processed_candles.append(ProcessedCandle(
+                    symbol_id, int(candle.timeframe.id), candle.timestamp,
+                    float(candle.open), float(candle.high), float(candle.low),
+                    float(candle.close), int(candle.volume)
+                ))
             except Exception as e:
                 self.logger.error(
                     "Failed to process candle",
@@ -70,16 +109,101 @@ class CandleProcessor:
                     timestamp=candle.timestamp,
                     error=str(e)
                 )
+        
+        return processed_candles
+    
+    def process_batch(
+        self,
+        candles: List[MT5Candle],
+        symbol_id: int,
+        last_db_time: Optional[datetime] = None
+    ) -> List[ProcessedCandle]:
+        """
+        Фильтрация, валидация и обработка свечей за один проход
+        
+        Эквивалентно filter_new_candles + validate_candle_data +
+        process_mt5_candles, но список обходится один раз, а невалидные
+        свечи попадают в одно сводное предупреждение.
+        
+        Args:
+            candles: Список свечей MT5
+            symbol_id: ID символа в БД
+            last_db_time: Время последней свечи в БД (если None, берем все свечи)
+            
+        Returns:
+            Список обработанных свечей
+        """
+        if last_db_time is not None and last_db_time.tzinfo is None:
+            last_db_time = last_db_time.replace(tzinfo=_UTC)
+        
+        symbol_id = int(symbol_id)
+        processed_candles = []
+        append = processed_candles.append
+        invalid_count = 0
+        
+        for candle in candles:
+            timestamp = candle.timestamp
+            if last_db_time is not None and timestamp <= last_db_time:
                 continue
+            
+            open_, high, low, close, volume = (
+                candle.open, candle.high, candle.low, candle.close, candle.volume
+            )
+            # Те же правила, что в validate_candle_data: цены > 0, low <= open/close <= high
+            if not (0 < low <= open_ <= high and low <= close <= high and volume >= 0):
+                invalid_count += 1
+                continue
+            
+            append(ProcessedCandle(
+                symbol_id, candle.timeframe.id, timestamp,
+                float(open_), float(high), float(low), float(close), int(volume)
+            ))
         
-        self.logger.debug(
-            "Candles processed",
-            input_count=len(candles),
-            processed_count=len(processed_candles)
-        )
+        if invalid_count > 0:
+            self.logger.warning(
+                "Invalid candles skipped",
+                total_candles=len(candles),
+                invalid_count=invalid_count
+            )
+        
+        if self._stdlib_logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Candles batch processed",
+                input_count=len(candles),
+                processed_count=len(processed_candles)
+            )
         
         return processed_candles
     
+    def iter_db_tuples(
+        self, 
+        processed_candles: Iterable[ProcessedCandle]
+    ) -> Iterator[Tuple]:
+        """
+        Ленивая конвертация обработанных свечей в кортежи для БД
+        
+        Кортежи создаются по мере чтения, поэтому генератор можно передать
+        прямо в copy_candles_batch, не держа в памяти весь список.
+        Типы уже приведены в process_mt5_candles.
+        
+        Args:
+            processed_candles: Обработанные свечи
+            
+        Yields:
+            Кортежи для вставки в БД
+        """
+        for candle in processed_candles:
+            yield (
+                candle.symbol_id,
+                candle.timeframe_id,
+                candle.timestamp,
+                candle.open,
+                candle.high,
+                candle.low,
+                candle.close,
+                candle.volume
+            )
+    
     def convert_to_db_tuples(
         self, 
         processed_candles: List[ProcessedCandle]
@@ -93,46 +217,24 @@ class CandleProcessor:
         Returns:
             Список кортежей для вставки в БД
         """
-        db_tuples = []
-        
-        for candle in processed_candles:
-            try:
-                # Явная конвертация типов для совместимости с psycopg2
-                db_tuple = (
-                    int(candle.symbol_id),
-                    int(candle.timeframe_id),
-                    candle.timestamp,
-                    float(candle.open),
-                    float(candle.high),
-                    float(candle.low),
-                    float(candle.close),
-                    int(candle.volume)
-                )
-                db_tuples.append(db_tuple)
-                
-            except Exception as e:
-                self.logger.error(
-                    "Failed to convert candle to DB tuple",
-                    symbol_id=candle.symbol_id,
-                    timeframe_id=candle.timeframe_id,
-                    timestamp=candle.timestamp,
-                    error=str(e)
-                )
-                continue
-        
-        return db_tuples
+        return list(self.iter_db_tuples(processed_candles))
     
     def filter_new_candles(
         self, 
         candles: List[MT5Candle], 
-        last_db_time: datetime
+        last_db_time: datetime,
+        assume_sorted: bool = False
     ) -> List[MT5Candle]:
         """
         Фильтрация новых свечей (после последнего времени в БД)
         
         Args:
             candles: Список свечей
-            last_db_time: Время последней свечи в БД
+            last_db_time: Время последней свечи в БД (ожидается aware UTC, как
+                его возвращает psycopg2 для timestamptz; naive считается UTC)
+            assume_sorted: Вызывающий гарантирует порядок свечей по времени (как
+                их отдает MT5) - граница ищется бинарным поиском; для
+                неупорядоченных свечей результат будет неверным
             
         Returns:
             Список новых свечей
@@ -140,21 +242,22 @@ class CandleProcessor:
         if last_db_time is None:
             return candles
         
-        # Убеждаемся что last_db_time в UTC
+        # Страховка для naive времени; aware значение используется как есть
         if last_db_time.tzinfo is None:
-            last_db_time = last_db_time.replace(tzinfo=timezone.utc)
+            last_db_time = last_db_time.replace(tzinfo=_UTC)
         
-        new_candles = []
-        for candle in candles:
-            if candle.timestamp > last_db_time:
-                new_candles.append(candle)
-        
-        self.logger.debug(
-            "Candles filtered",
-            total_candles=len(candles),
-            new_candles=len(new_candles),
-            last_db_time=last_db_time
-        )
+        if assume_sorted:
+            new_candles = candles[bisect_right(candles, last_db_time, key=_timestamp_key):]
+        else:
+            new_candles = [c for c in candles if c.timestamp > last_db_time]
+        
+        if self._stdlib_logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Candles filtered",
+                total_candles=len(candles),
+                new_candles=len(new_candles),
+                last_db_time=last_db_time
+            )
         
         return new_candles
     
@@ -240,6 +343,34 @@ class CandleProcessor:
             )
             return False
     
+    def filter_valid_candles(self, candles: List[MT5Candle]) -> List[MT5Candle]:
+        """
+        Отбор валидных свечей (правила validate_candle_data)
+        
+        В отличие от поштучного validate_candle_data, невалидные свечи
+        попадают в одно сводное предупреждение на пакет.
+        
+        Args:
+            candles: Список свечей
+            
+        Returns:
+            Список валидных свечей
+        """
+        valid_candles = [
+            c for c in candles
+            if 0 < c.low <= c.open <= c.high and c.low <= c.close <= c.high and c.volume >= 0
+        ]
+        
+        invalid_count = len(candles) - len(valid_candles)
+        if invalid_count > 0:
+            self.logger.warning(
+                "Invalid candles skipped",
+                total_candles=len(candles),
+                invalid_count=invalid_count
+            )
+        
+        return valid_candles
+    
     def calculate_candle_statistics(
         self, 
         candles: List[MT5Candle]
@@ -261,22 +392,41 @@ class CandleProcessor:
                 'price_range': None
             }
         
-        # Временной диапазон
-        timestamps = [c.timestamp for c in candles]
-        start_time = min(timestamps)
-        end_time = max(timestamps)
+        # Объем, временной и ценовой диапазоны за один проход, без промежуточных списков
+        start_time = end_time = candles[0].timestamp
+        min_price = float('inf')
+        max_price = float('-inf')
+        volume_sum = 0
         
-        # Объемы
-        volumes = [c.volume for c in candles]
-        avg_volume = sum(volumes) / len(volumes) if volumes else 0
-        
-        # Ценовой диапазон
-        all_prices = []
         for candle in candles:
-            all_prices.extend([candle.open, candle.high, candle.low, candle.close])
+            volume_sum += candle.volume
+            
+            timestamp = candle.timestamp
+            if timestamp < start_time:
+                start_time = timestamp
+            elif timestamp > end_time:
+                end_time = timestamp
+            
+            # Сравнения развернуты: цикл по кортежу цен заметно медленнее
+            open_, high, low, close = candle.open, candle.high, candle.low, candle.close
+            if low < min_price:
+                min_price = low
+            if open_ < min_price:
+                min_price = open_
+            if close < min_price:
+                min_price = close
+            if high < min_price:
+                min_price = high
+            if high > max_price:
+                max_price = high
+            if open_ > max_price:
+                max_price = open_
+            if close > max_price:
+                max_price = close
+            if low > max_price:
+                max_price = low
         
-        min_price = min(all_prices)
-        max_price = max(all_prices)
+        avg_volume = volume_sum / len(candles)
         
         return {
             'count': len(candles),
@@ -295,29 +445,31 @@ class CandleProcessor:
     
     def group_candles_by_timeframe(
         self, 
-        candles: List[MT5Candle]
+        candles: List[MT5Candle],
+        already_sorted: bool = False
     ) -> Dict[Timeframe, List[MT5Candle]]:
         """
         Группировка свечей по таймфреймам
         
         Args:
             candles: Список свечей
+            already_sorted: Свечи уже упорядочены по времени (сортировка не нужна)
             
         Returns:
             Словарь с группированными свечами
         """
-        grouped = {}
+        # Ключ - сам член Timeframe (хэшируемый), без пересборки ключей
+        grouped: Dict[Timeframe, List[MT5Candle]] = defaultdict(list)
         
         for candle in candles:
-            if candle.timeframe not in grouped:
-                grouped[candle.timeframe] = []
             grouped[candle.timeframe].append(candle)
         
         # Сортируем свечи в каждой группе по времени
-        for timeframe in grouped:
-            grouped[timeframe].sort(key=lambda x: x.timestamp)
+        if not already_sorted:
+            for group in grouped.values():
+                group.sort(key=_timestamp_key)
         
-        return grouped
+        return dict(grouped)
     
     def remove_duplicates(
         self, 
@@ -332,16 +484,12 @@ class CandleProcessor:
         Returns:
             Список свечей без дубликатов
         """
-        seen = set()
-        unique_candles = []
-        
+        # Словарь сохраняет порядок вставки; setdefault оставляет первую свечу с ключом
+        unique = {}
         for candle in candles:
-            # Создаем ключ для идентификации дубликатов
-            key = (candle.symbol, candle.timeframe, candle.timestamp)
-            
-            if key not in seen:
-                seen.add(key)
-                unique_candles.append(candle)
+            unique.setdefault((candle.symbol, candle.timeframe, candle.timestamp), candle)
+        
+        unique_candles = list(unique.values())
         
         removed_count = len(candles) - len(unique_candles)
         if removed_count > 0:
@@ -352,4 +500,168 @@ class CandleProcessor:
                 removed_count=removed_count
             )
         
-        return unique_candles 
\ No newline at end of file
+        return unique_candles
+    
+    def validate_rates(self, rates: np.ndarray) -> np.ndarray:
+        """
+        Векторная валидация сырых баров MT5 (правила validate_candle_data)
+        
+        Args:
+            rates: Структурированный массив баров из MT5Client.fetch_rates
+            
+        Returns:
+            Булева маска валидных баров
+        """
+        open_, high, low, close = rates['open'], rates['high'], rates['low'], rates['close']
+        
+        mask = np.isfinite(open_) & np.isfinite(high) & np.isfinite(low) & np.isfinite(close)
+        mask &= (open_ > 0) & (high > 0) & (low > 0) & (close > 0)
+        mask &= high >= low
+        mask &= (low <= open_) & (open_ <= high)
+        mask &= (low <= close) & (close <= high)
+        mask &= rates['tick_volume'] >= 0
+        
+        invalid_count = len(mask) - int(np.count_nonzero(mask))
+        if invalid_count > 0:
+            self.logger.warning(
+                "Invalid candles skipped",
+                total_candles=len(mask),
+                invalid_count=invalid_count
+            )
+        
+        return mask
+    
+    def select_rates(
+        self,
+        rates: np.ndarray,
+        last_db_time: Optional[datetime] = None
+    ) -> np.ndarray:
+        """
+        Отбор валидных новых баров MT5 без конвертации в Python объекты
+        
+        Валидация и фильтрация по времени выполняются масками numpy,
+        дубликаты по времени убираются np.unique (первый бар остается).
+        Результат упорядочен по времени.
+        
+        Args:
+            rates: Структурированный массив баров из MT5Client.fetch_rates
+            last_db_time: Время последней свечи в БД (если None, берем все бары)
+            
+        Returns:
+            Структурированный массив отобранных баров
+        """
+        if len(rates) == 0:
+            return rates
+        
+        mask = self.validate_rates(rates)
+        
+        if last_db_time is not None:
+            if last_db_time.tzinfo is None:
+                last_db_time = last_db_time.replace(tzinfo=_UTC)
+            # Время баров - целые секунды, сравнение с отброшенной дробной частью эквивалентно
+            mask &= rates['time'] > int(last_db_time.timestamp())
+        
+        selected = rates[mask]
+        
+        # Проверка упорядоченности - O(n); сортировка с дедупликацией только при необходимости
+        times = selected['time']
+        if len(times) > 1 and not (times[1:] > times[:-1]).all():
+            _, first_index = np.unique(times, return_index=True)
+            selected = selected[first_index]
+        
+        if self._stdlib_logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Rates processed",
+                input_count=len(rates),
+                processed_count=len(selected)
+            )
+        
+        return selected
+    
+    def iter_rates_db_tuples(
+        self,
+        rates: np.ndarray,
+        symbol_id: int,
+        timeframe: Timeframe
+    ) -> Iterator[Tuple]:
+        """
+        Ленивая конвертация отобранных баров в кортежи для БД
+        
+        Колонки переводятся в Python типы целиком, кортежи создаются по
+        мере потребления (например, при записи через COPY).
+        """
+        return zip(
+            repeat(int(symbol_id)),
+            repeat(timeframe.id),
+            MT5Client.rates_to_datetimes(rates),
+            rates['open'].tolist(),
+            rates['high'].tolist(),
+            rates['low'].tolist(),
+            rates['close'].tolist(),
+            rates['tick_volume'].tolist()
+        )
+    
+    def process_rates(
+        self,
+        rates: np.ndarray,
+        symbol_id: int,
+        timeframe: Timeframe,
+        last_db_time: Optional[datetime] = None
+    ) -> List[Tuple]:
+        """
+        Обработка сырых баров MT5 в кортежи для БД без объектов на каждую свечу
+        
+        Args:
+            rates: Структурированный массив баров из MT5Client.fetch_rates
+            symbol_id: ID символа в БД
+            timeframe: Таймфрейм баров
+            last_db_time: Время последней свечи в БД (если None, берем все бары)
+            
+        Returns:
+            Список кортежей для вставки в БД, упорядоченный по времени
+        """
+        if len(rates) == 0:
+            return []
+        
+        selected = self.select_rates(rates, last_db_time)
+        return list(self.iter_rates_db_tuples(selected, symbol_id, timeframe))
+    
+    def calculate_rates_statistics(self, rates: np.ndarray) -> Dict[str, Any]:
+        """
+        Вычисление статистики по сырым барам MT5 (формат calculate_candle_statistics)
+        
+        Args:
+            rates: Структурированный массив баров из MT5Client.fetch_rates
+            
+        Returns:
+            Словарь со статистикой
+        """
+        if len(rates) == 0:
+            return {
+                'count': 0,
+                'time_range': None,
+                'avg_volume': 0,
+                'price_range': None
+            }
+        
+        times = rates['time']
+        start_time = datetime.fromtimestamp(int(times.min()), tz=_UTC)
+        end_time = datetime.fromtimestamp(int(times.max()), tz=_UTC)
+        
+        min_price = float(min(rates[name].min() for name in ('open', 'high', 'low', 'close')))
+        max_price = float(max(rates[name].max() for name in ('open', 'high', 'low', 'close')))
+        
+        return {
+            'count': len(rates),
+            'time_range': {
+                'start': start_time,
+                'end': end_time,
+                'duration_hours': (end_time - start_time).total_seconds() / 3600
+            },
+            'avg_volume': float(rates['tick_volume'].mean()),
+            'price_range': {
+                'min': min_price,
+                'max': max_price,
+                'spread': max_price - min_price
+            }
+        }
@@ -2,11 +2,16 @@
 Historical data loader for MT5
 """
 
+import queue
+import threading
 import time
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass, replace
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
 
 from ..config.settings import Settings, CurrencyPair
 from ..config.constants import Timeframe
@@ -17,7 +22,85 @@ from ..data.candle_processor import CandleProcessor
 from ..utils.logging import get_logger
 
 
-@dataclass
+# Число накопленных баров, при котором буфер записывается в БД
+FLUSH_THRESHOLD = 50000
+
+# Максимум пакетов баров, ожидающих записи в параллельном режиме
+WRITE_QUEUE_SIZE = 8
+
+# Прогресс загрузки логируется раз в столько комбинаций
+PROGRESS_LOG_INTERVAL = 10
+
+# Попыток записи буфера в БД при временных ошибках
+DB_RETRY_ATTEMPTS = 3
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Наивное время считается UTC (как и в запросах к MT5)"""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class RatesChunk(NamedTuple):
+    """Отобранные бары одной комбинации, ожидающие записи в БД"""
+    symbol: str
+    symbol_id: int
+    timeframe: Timeframe
+    rates: np.ndarray
+
+
+class CandleBuffer:
+    """
+    Потокобезопасный буфер баров для записи в БД крупными пакетами
+    
+    Бары всех комбинаций копятся в одном буфере в виде массивов numpy
+    (без кортежа на каждую свечу); при достижении порога буфер целиком
+    забирается одной операцией и пишется одним COPY.
+    """
+    
+    def __init__(self, threshold: int = FLUSH_THRESHOLD):
+        self.threshold = threshold
+        self._chunks: List[RatesChunk] = []
+        self._row_count = 0
+        self._lock = threading.Lock()
+    
+    def add(self, chunk: RatesChunk) -> Optional[List[RatesChunk]]:
+        """
+        Добавление пакета баров в буфер
+        
+        Returns:
+            Накопленные пакеты, если достигнут порог (буфер при этом очищается), иначе None
+        """
+        with self._lock:
+            self._chunks.append(chunk)
+            self._row_count += len(chunk.rates)
+            if self._row_count < self.threshold:
+                return None
+            return self._take()
+    
+    def drain(self) -> List[RatesChunk]:
+        """Забрать все накопленные пакеты"""
+        with self._lock:
+            return self._take()
+    
+    def _take(self) -> List[RatesChunk]:
+        batch, self._chunks, self._row_count = self._chunks, [], 0
+        return batch
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._row_count
+
+
+class Combination(NamedTuple):
+    """Комбинация пары/таймфрейма для загрузки"""
+    symbol: str
+    symbol_id: int
+    timeframe: Timeframe
+    timeframe_id: int
+    priority: int
+
+
+@dataclass(slots=True, frozen=True)
 class LoadResult:
     """Результат загрузки для одной комбинации"""
     symbol: str
@@ -38,13 +121,15 @@ class HistoricalDataLoader:
         start_date: datetime,
         end_date: datetime,
         parallel: bool = False,
-        max_workers: int = 3
+        db_writers: int = 2,
+        skip_loaded: bool = False
     ):
         self.settings = settings
         self.start_date = start_date
         self.end_date = end_date
         self.parallel = parallel
-        self.max_workers = max_workers
+        self.db_writers = db_writers
+        self.skip_loaded = skip_loaded
         
         # Инициализация компонентов
         self.logger = get_logger(__name__)
@@ -52,6 +137,18 @@ class HistoricalDataLoader:
         self.mt5_client = MT5Client(settings.mt5)
         self.telegram = TelegramNotifier(settings.telegram)
         self.candle_processor = CandleProcessor()
+        self._buffer = CandleBuffer()
+        
+        # Комбинации, бары которых не удалось записать: (symbol, timeframe) -> число строк.
+        # Буфер пишут несколько потоков записи, поэтому доступ под блокировкой
+        self._unsaved: Dict[Tuple[str, Timeframe], int] = {}
+        self._unsaved_lock = threading.Lock()
+        
+        # Комбинации зависят только от настроек - строятся один раз
+        self._combinations = self._create_combinations()
+        
+        # Уже загруженные диапазоны: (symbol_id, timeframe_id) -> (первая, последняя свеча)
+        self._coverage: Dict[Tuple[int, int], Tuple[datetime, datetime]] = {}
         
         # Статистика
         self.stats = {
@@ -59,6 +156,7 @@ class HistoricalDataLoader:
             'successful_combinations': 0,
             'failed_combinations': 0,
             'total_candles': 0,
+            'unsaved_candles': 0,
             'start_time': None,
             'end_time': None
         }
@@ -76,8 +174,10 @@ class HistoricalDataLoader:
             self.logger.error("Connection check failed")
             return
         
-        # Создание комбинаций для загрузки
-        combinations = self._create_combinations()
+        combinations = self._combinations
+        
+        if self.skip_loaded:
+            self._coverage = self._load_coverage(combinations)
         self.stats['total_combinations'] = len(combinations)
         
         self.logger.info(f"Created {len(combinations)} combinations for loading")
@@ -91,8 +191,9 @@ class HistoricalDataLoader:
         else:
             results = self._load_sequential(combinations)
         
-        # Обработка результатов
-        self._process_results(results)
+        # Запись остатка буфера и обработка результатов с учетом ошибок записи
+        self._flush_buffer(self._buffer.drain())
+        self._process_results(self._apply_write_failures(results))
         
         # Завершение
         self.stats['end_time'] = datetime.now()
@@ -125,106 +226,172 @@ class HistoricalDataLoader:
             self.logger.error("Connection check failed", error=str(e))
             return False
     
-    def _create_combinations(self) -> List[Dict[str, Any]]:
-        """Создание комбинаций пар/таймфреймов для загрузки"""
-        combinations = []
-        
-        enabled_pairs = [p for p in self.settings.currency_pairs if p.enabled]
-        
-        for pair in enabled_pairs:
-            for timeframe in self.settings.active_timeframes:
-                combination = {
-                    'symbol': pair.symbol,
-                    'symbol_id': pair.symbol_id,
-                    'timeframe': timeframe,
-                    'timeframe_id': timeframe.id,
-                    'priority': pair.priority
-                }
-                combinations.append(combination)
+    def _create_combinations(self) -> List[Combination]:
+        """
+        Создание комбинаций пар/таймфреймов для загрузки
+        
+        Попутно сохраняет отсортированные списки пар и таймфреймов для
+        уведомлений, чтобы не собирать их заново из комбинаций.
+        """
+        pairs = self.settings.enabled_pairs
+        timeframes = self.settings.active_timeframes
+        
+        combinations = [
+            Combination(pair.symbol, pair.symbol_id, timeframe, timeframe.id, pair.priority)
+            for pair in pairs
+            for timeframe in timeframes
+        ]
+        
+        if combinations:
+            self._symbols = sorted({pair.symbol for pair in pairs})
+            self._timeframe_names = [tf.name for tf in sorted(set(timeframes), key=attrgetter('value'))]
+        else:
+            self._symbols = []
+            self._timeframe_names = []
         
         # Сортировка по приоритету
-        combinations.sort(key=lambda x: x['priority'])
+        combinations.sort(key=attrgetter('priority'))
         
         return combinations
     
-    def _load_sequential(self, combinations: List[Dict[str, Any]]) -> List[LoadResult]:
+    def _load_coverage(
+        self,
+        combinations: List[Combination]
+    ) -> Dict[Tuple[int, int], Tuple[datetime, datetime]]:
+        """Загруженные диапазоны всех комбинаций одним запросом к БД"""
+        try:
+            coverage = self.db_manager.get_candles_coverage(
+                {c.symbol_id for c in combinations},
+                {c.timeframe_id for c in combinations}
+            )
+            self.logger.info("Existing candles coverage loaded", combinations=len(coverage))
+            return coverage
+        except Exception as e:
+            # Без покрытия загружаем период целиком - upsert идемпотентен
+            self.logger.warning("Failed to load candles coverage, loading full range", error=str(e))
+            return {}
+    
+    def _missing_ranges(self, combination: Combination) -> List[Tuple[datetime, datetime]]:
+        """
+        Части периода загрузки, которых еще нет в БД
+        
+        Покрытие определяется по первой и последней свече, поэтому
+        догружаются только начало и конец периода за пределами уже
+        загруженного диапазона; пропуски внутри него не проверяются.
+        """
+        start_date = _as_utc(self.start_date)
+        end_date = _as_utc(self.end_date)
+        
+        coverage = self._coverage.get((combination.symbol_id, combination.timeframe_id))
+        if coverage is None:
+            return [(start_date, end_date)]
+        
+        first_time, last_time = coverage
+        ranges = []
+        # Границы запросов MT5 включительные - сдвигаем на секунду от загруженных свечей
+        if start_date < first_time:
+            ranges.append((start_date, min(end_date, first_time - timedelta(seconds=1))))
+        if end_date > last_time:
+            ranges.append((max(start_date, last_time + timedelta(seconds=1)), end_date))
+        return ranges
+    
+    def _load_sequential(self, combinations: List[Combination]) -> List[LoadResult]:
         """Последовательная загрузка данных"""
         results = []
         
+        total = len(combinations)
+        
         for i, combination in enumerate(combinations, 1):
-            self.logger.info(
-                f"Loading {i}/{len(combinations)}: {combination['symbol']} {combination['timeframe'].value}"
-            )
+            if i % PROGRESS_LOG_INTERVAL == 1 or i == total:
+                self.logger.info(
+                    "Loading %d/%d: %s %s", i, total, combination.symbol, combination.timeframe.value
+                )
             
             result = self._load_single_combination(combination)
             results.append(result)
-            
-            # Небольшая пауза между запросами
-            time.sleep(0.1)
         
         return results
     
-    def _load_parallel(self, combinations: List[Dict[str, Any]]) -> List[LoadResult]:
-        """Параллельная загрузка данных"""
+    def _load_parallel(self, combinations: List[Combination]) -> List[LoadResult]:
+        """
+        Параллельная загрузка данных
+        
+        Конвейер производитель/потребитель. Модуль MetaTrader5 держит одно
+        соединение с терминалом на процесс, поэтому загрузка из MT5 идет в
+        одном потоке (текущем): параллельные запросы лишь ждали бы блокировку
+        клиента. Бары кладутся в ограниченную очередь, а db_writers потоков
+        записи копят их в общем буфере и пишут в БД, пока загружаются
+        следующие окна. Буфер пишется по достижении FLUSH_THRESHOLD строк,
+        поэтому несколько потоков записи работают одновременно, только если
+        новый пакет набирается раньше, чем записан предыдущий.
+        """
+        write_queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        
+        def writer() -> None:
+            while True:
+                chunk = write_queue.get()
+                if chunk is None:
+                    return
+                self._flush_buffer(self._buffer.add(chunk))
+        
+        writers = [
+            threading.Thread(target=writer, name=f"CandleWriter-{n}", daemon=True)
+            for n in range(max(self.db_writers, 1))
+        ]
+        for thread in writers:
+            thread.start()
+        
         results = []
+        total = len(combinations)
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Создаем задачи
-            future_to_combination = {
-                executor.submit(self._load_single_combination, combo): combo 
-                for combo in combinations
-            }
-            
-            # Обрабатываем результаты по мере завершения
-            for i, future in enumerate(as_completed(future_to_combination), 1):
-                combination = future_to_combination[future]
+        try:
+            for i, combination in enumerate(combinations, 1):
+                # put блокируется, если запись отстает: память ограничена размером очереди
+                results.append(self._fetch_combination(combination, write_queue.put))
                 
-                try:
-                    result = future.result()
-                    results.append(result)
-                    
+                if i % PROGRESS_LOG_INTERVAL == 0 or i == total:
                     self.logger.info(
-                        f"Completed {i}/{len(combinations)}: {combination['symbol']} {combination['timeframe'].value}"
+                        "Completed %d/%d: %s %s", i, total, combination.symbol, combination.timeframe.value
                     )
-                    
-                except Exception as e:
-                    self.logger.error(
-                        f"Failed to load {combination['symbol']} {combination['timeframe'].value}",
-                        error=str(e)
-                    )
-                    
-                    result = LoadResult(
-                        symbol=combination['symbol'],
-                        timeframe=combination['timeframe'],
-                        success=False,
-                        candles_count=0,
-                        error_message=str(e)
-                    )
-                    results.append(result)
+        finally:
+            # Загрузка завершена - останавливаем потоки записи
+            for _ in writers:
+                write_queue.put(None)
+            for thread in writers:
+                thread.join()
         
         return results
     
-    def _load_single_combination(self, combination: Dict[str, Any]) -> LoadResult:
-        """Загрузка данных для одной комбинации"""
-        symbol = combination['symbol']
-        timeframe = combination['timeframe']
-        symbol_id = combination['symbol_id']
+    def _load_single_combination(self, combination: Combination) -> LoadResult:
+        """Загрузка данных для одной комбинации с записью в буфер"""
+        return self._fetch_combination(
+            combination, lambda chunk: self._flush_buffer(self._buffer.add(chunk))
+        )
+    
+    def _fetch_combination(
+        self,
+        combination: Combination,
+        sink: Callable[[RatesChunk], None]
+    ) -> LoadResult:
+        """
+        Потоковая загрузка и валидация данных для одной комбинации
+        
+        Период запрашивается у MT5 окнами; отобранные бары каждого окна
+        сразу передаются в sink (буфер или очередь записи), поэтому длинные
+        диапазоны не собираются в памяти целиком.
+        
+        Args:
+            combination: Комбинация пары/таймфрейма
+            sink: Получатель пакетов отобранных баров
+        """
+        symbol = combination.symbol
+        timeframe = combination.timeframe
+        symbol_id = combination.symbol_id
         
         try:
-            self.logger.debug(
-                f"Loading {symbol} {timeframe.value} from {self.start_date} to {self.end_date}"
-            )
-            
-            # Загрузка свечей из MT5
-            candles = self.mt5_client.fetch_candles(
-                symbol=symbol,
-                timeframe=timeframe,
-                from_time=self.start_date,
-                to_time=self.end_date
-            )
-            
-            if not candles:
-                self.logger.warning(f"No candles received for {symbol} {timeframe.value}")
+            ranges = self._missing_ranges(combination)
+            if not ranges:
+                self.logger.info("Already loaded %s %s, skipping", symbol, timeframe.value)
                 return LoadResult(
                     symbol=symbol,
                     timeframe=timeframe,
@@ -234,14 +401,40 @@ class HistoricalDataLoader:
                     end_time=self.end_date
                 )
             
-            # Валидация и фильтрация свечей
-            valid_candles = []
-            for candle in candles:
-                if self.candle_processor.validate_candle_data(candle):
-                    valid_candles.append(candle)
+            self.logger.debug("Loading %s %s", symbol, timeframe.value, ranges=ranges)
+            
+            received_count = 0
+            inserted_count = 0
+            start_time = end_time = None
             
-            if not valid_candles:
-                self.logger.warning(f"No valid candles for {symbol} {timeframe.value}")
+            # Окна сырых баров из MT5 (без объектов на каждую свечу)
+            for range_start, range_end in ranges:
+                for rates in self.mt5_client.iter_rates(
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    from_time=range_start,
+                    to_time=range_end
+                ):
+                    received_count += len(rates)
+                    
+                    # Векторная валидация и дедупликация; кортежи для БД создаются только при записи
+                    selected = self.candle_processor.select_rates(rates)
+                    if len(selected) == 0:
+                        continue
+                    
+                    # Диапазоны и окна идут по возрастанию времени, бары внутри окна упорядочены
+                    times = selected['time']
+                    if start_time is None:
+                        start_time = datetime.fromtimestamp(int(times[0]), tz=timezone.utc)
+                    end_time = datetime.fromtimestamp(int(times[-1]), tz=timezone.utc)
+                    inserted_count += len(selected)
+                    sink(RatesChunk(symbol, symbol_id, timeframe, selected))
+            
+            if inserted_count == 0:
+                if received_count == 0:
+                    self.logger.warning("No candles received for %s %s", symbol, timeframe.value)
+                else:
+                    self.logger.warning("No valid candles for %s %s", symbol, timeframe.value)
                 return LoadResult(
                     symbol=symbol,
                     timeframe=timeframe,
@@ -251,32 +444,10 @@ class HistoricalDataLoader:
                     end_time=self.end_date
                 )
             
-            # Удаление дубликатов
-            unique_candles = self.candle_processor.remove_duplicates(valid_candles)
-            
-            # Обработка свечей для БД
-            processed_candles = self.candle_processor.process_mt5_candles(
-                unique_candles, 
-                symbol_id
-            )
-            
-            # Конвертация в формат для БД
-            db_tuples = self.candle_processor.convert_to_db_tuples(processed_candles)
-            
-            # Вставка в БД
-            inserted_count = self.db_manager.insert_candles_batch(db_tuples)
-            
-            # Статистика по времени
-            timestamps = [c.timestamp for c in unique_candles]
-            start_time = min(timestamps)
-            end_time = max(timestamps)
-            
             self.logger.info(
-                f"Loaded {symbol} {timeframe.value}: {inserted_count} candles",
-                symbol=symbol,
-                timeframe=timeframe.value,
-                candles_count=inserted_count,
-                time_range=f"{start_time} - {end_time}"
+                "Loaded %s %s: %d candles", symbol, timeframe.value, inserted_count,
+                start_time=start_time,
+                end_time=end_time
             )
             
             return LoadResult(
@@ -302,20 +473,94 @@ class HistoricalDataLoader:
                 error_message=str(e)
             )
     
+    def _flush_buffer(self, batch: Optional[List[RatesChunk]]) -> None:
+        """
+        Запись накопленных баров в БД через COPY с повторными попытками
+        
+        Кортежи строк создаются лениво по мере чтения COPY, поэтому в памяти
+        не материализуется список строк всего пакета. Пакет содержит бары
+        разных комбинаций; если записать его не удалось, все эти комбинации
+        запоминаются как незаписанные и в итогах считаются неудачными.
+        """
+        if not batch:
+            return
+        
+        row_count = sum(len(chunk.rates) for chunk in batch)
+        db_retry_delay = 0.1
+        
+        for attempt in range(DB_RETRY_ATTEMPTS):
+            # Генератор строк расходуется при записи - на каждую попытку новый
+            rows = chain.from_iterable(
+                self.candle_processor.iter_rates_db_tuples(chunk.rates, chunk.symbol_id, chunk.timeframe)
+                for chunk in batch
+            )
+            try:
+                self.db_manager.copy_candles_batch(rows)
+                self.logger.info("Candles buffer flushed", rows=row_count)
+                return
+            except Exception as e:
+                if attempt < DB_RETRY_ATTEMPTS - 1:
+                    self.logger.warning(
+                        "Candles buffer flush retry %d/%d: %s",
+                        attempt + 1, DB_RETRY_ATTEMPTS, e,
+                        rows=row_count
+                    )
+                    time.sleep(db_retry_delay)
+                    db_retry_delay *= 2
+                else:
+                    self.logger.error(
+                        "Failed to flush candles buffer after %d attempts: %s",
+                        DB_RETRY_ATTEMPTS, e,
+                        rows=row_count,
+                        combinations=len({(chunk.symbol, chunk.timeframe) for chunk in batch})
+                    )
+        
+        with self._unsaved_lock:
+            self.stats['unsaved_candles'] += row_count
+            for chunk in batch:
+                key = (chunk.symbol, chunk.timeframe)
+                self._unsaved[key] = self._unsaved.get(key, 0) + len(chunk.rates)
+    
+    def _apply_write_failures(self, results: List[LoadResult]) -> List[LoadResult]:
+        """Результаты комбинаций, бары которых не записаны в БД, помечаются неудачными"""
+        if not self._unsaved:
+            return results
+        
+        failed_results = []
+        for result in results:
+            unsaved = self._unsaved.get((result.symbol, result.timeframe))
+            if unsaved and result.success:
+                result = replace(
+                    result,
+                    success=False,
+                    error_message=f"Failed to write {unsaved} candles to database"
+                )
+            failed_results.append(result)
+        return failed_results
+    
     def _process_results(self, results: List[LoadResult]) -> None:
         """Обработка результатов загрузки"""
-        successful = [r for r in results if r.success]
-        failed = [r for r in results if not r.success]
+        # Один проход: счетчики успешных и свечей, неудачные - в отдельный список
+        successful_count = 0
+        total_candles = 0
+        failed = []
         
-        self.stats['successful_combinations'] = len(successful)
+        for result in results:
+            if result.success:
+                successful_count += 1
+                total_candles += result.candles_count
+            else:
+                failed.append(result)
+        
+        self.stats['successful_combinations'] = successful_count
         self.stats['failed_combinations'] = len(failed)
-        self.stats['total_candles'] = sum(r.candles_count for r in successful)
+        self.stats['total_candles'] = total_candles
         
         # Логирование результатов
         self.logger.info(
             "Loading results",
             total_combinations=len(results),
-            successful=len(successful),
+            successful=successful_count,
             failed=len(failed),
             total_candles=self.stats['total_candles']
         )
@@ -328,12 +573,12 @@ class HistoricalDataLoader:
                     f"  {result.symbol} {result.timeframe.value}: {result.error_message}"
                 )
     
-    def _send_start_notification(self, combinations: List[Dict[str, Any]]) -> None:
+    def _send_start_notification(self, combinations: List[Combination]) -> None:
         """Отправка уведомления о начале загрузки"""
+        symbols = self._symbols
+        timeframes = self._timeframe_names
+        
         try:
-            symbols = list(set(c['symbol'] for c in combinations))
-            timeframes = list(set(c['timeframe'].value for c in combinations))
-            
             message = (
                 f"📥 <b>Начало загрузки исторических данных</b>\n"
                 f"📅 Период: {self.start_date.strftime('%Y-%m-%d')} - {self.end_date.strftime('%Y-%m-%d')}\n"
@@ -343,7 +588,8 @@ class HistoricalDataLoader:
                 f"⚡ Режим: {'Параллельный' if self.parallel else 'Последовательный'}"
             )
             
-            self.telegram.send_message(message, "system")
+            # Уведомление отправляется в фоне и не задерживает загрузку
+            self.telegram.send_message_nowait(message, "system")
             
         except Exception as e:
             self.logger.error("Failed to send start notification", error=str(e))
@@ -363,7 +609,8 @@ class HistoricalDataLoader:
                 f"  • Свечей: {self.stats['total_candles']:,}"
             )
             
-            self.telegram.send_message(message, "system")
+            # Уведомление отправляется в фоне и не задерживает загрузку
+            self.telegram.send_message_nowait(message, "system")
             
         except Exception as e:
             self.logger.error("Failed to send completion notification", error=str(e))
@@ -381,6 +628,8 @@ class HistoricalDataLoader:
         print(f"✅ Успешных: {self.stats['successful_combinations']}")
         print(f"❌ Ошибок: {self.stats['failed_combinations']}")
         print(f"💾 Загружено свечей: {self.stats['total_candles']:,}")
+        if self.stats['unsaved_candles']:
+            print(f"⚠️ Не записано в БД: {self.stats['unsaved_candles']:,}")
         
         if self.stats['total_combinations'] > 0:
             success_rate = (self.stats['successful_combinations'] / self.stats['total_combinations']) * 100
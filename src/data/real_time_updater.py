@@ -2,13 +2,17 @@
 Real-time data updater for MT5
 """
 
+import logging
+import queue
 import time
 import signal
 import threading
-from typing import List, Dict, Any, Optional
+from collections import deque
+from typing import Deque, List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, replace
 
 from ..config.settings import Settings, CurrencyPair
 from ..config.constants import Timeframe, SystemStatus
@@ -17,10 +21,29 @@ from ..core.mt5_client import MT5Client
 from ..core.telegram_notifier import TelegramNotifier
 from ..data.candle_processor import CandleProcessor
 from ..utils.logging import get_logger
-from ..utils.helpers import get_utc_now, calculate_seconds_until_next_timeframe
+from ..utils.helpers import get_utc_now
 
 
-@dataclass
+# Строк в одной транзакции записи цикла обновления
+INSERT_BATCH_SIZE = 20000
+
+# С какого размера пакет пишется через COPY (первичная загрузка, догрузка после
+# простоя); обычные небольшие пакеты цикла - многострочным INSERT
+COPY_MIN_ROWS = 1000
+
+# Попыток обращения к БД при временных ошибках
+DB_RETRY_ATTEMPTS = 3
+
+# Через сколько секунд простоя очереди поток записи пишет накопленный пакет
+WRITE_FLUSH_INTERVAL = 0.2
+
+# Период проверки состояния потока записи при ожидании итогов цикла
+WRITE_RESULT_POLL_INTERVAL = 1.0
+
+# Сколько секунд после сигнала остановки ждать завершения записи цикла
+WRITE_STOP_TIMEOUT = 30.0
+
+@dataclass(slots=True, frozen=True)
 class UpdateResult:
     """Результат обновления для одной комбинации"""
     symbol: str
@@ -39,14 +62,30 @@ class RealTimeDataUpdater:
         
         # Инициализация компонентов
         self.logger = get_logger(__name__)
+        # Уровень проверяется у stdlib логгера: записи по каждой комбинации
+        # не собираются, когда уровень отфильтрован
+        self._stdlib_logger = logging.getLogger(__name__)
         self.db_manager = DatabaseManager(settings.database)
         self.mt5_client = MT5Client(settings.mt5)
         self.telegram = TelegramNotifier(settings.telegram)
         self.candle_processor = CandleProcessor()
         
+        # Комбинации зависят только от настроек - строятся один раз
+        self._combinations = self._create_combinations()
+        self._combinations_by_timeframe: Dict[Timeframe, List[Dict[str, Any]]] = {}
+        for combination in self._combinations:
+            self._combinations_by_timeframe.setdefault(combination['timeframe'], []).append(combination)
+        
+        # Таблица расписания (таймфрейм, период в секундах, включен) строится один раз:
+        # границы таймфреймов кратны периоду от начала эпохи, поэтому время до
+        # следующей границы считается остатком от деления без обхода настроек
+        self._timeframe_schedule = self._create_timeframe_schedule()
+        
         # Состояние системы
         self.running = False
         self.status = SystemStatus.STOPPED
+        # Сигнал остановки прерывает ожидание между циклами сразу, без досыпания интервала
+        self._stop_event = threading.Event()
         
         # Статистика
         self.stats = {
@@ -59,6 +98,29 @@ class RealTimeDataUpdater:
             'pair_stats': {}
         }
         
+        # Скользящее окно вставок (время, количество) для подсчета свечей за последний час;
+        # пополняется потоком записи, читается при heartbeat
+        self._recent_inserts: Deque[Tuple[datetime, int]] = deque()
+        self._recent_inserts_total = 0
+        self._recent_inserts_lock = threading.Lock()
+        
+        # Конвейер записи: потоки загрузки кладут строки в очередь,
+        # отдельный поток пишет их в БД, пока загружаются следующие комбинации
+        self._insert_queue: queue.Queue = queue.Queue(
+            maxsize=2 * max(settings.data_update['max_workers'], 1)
+        )
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name="CandleWriter", daemon=True
+        )
+        self._writer_thread.start()
+        
+        # Пул потоков обновления создается один раз и переиспользуется циклами.
+        # Ограничиваем количество потоков для предотвращения исчерпания подключений
+        self._max_workers = min(settings.data_update['max_workers'], 3)  # Максимум 3 потока
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_workers, thread_name_prefix="mt5-upd"
+        )
+        
         # Настройка обработки сигналов
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -87,23 +149,27 @@ class RealTimeDataUpdater:
         
         failed_attempts = 0
         max_retries = self.settings.data_update['max_retries']
-        last_heartbeat = get_utc_now()
+        # Интервалы отсчитываются по монотонным часам: не зависят от перевода системного времени
+        last_heartbeat = time.monotonic()
         heartbeat_interval = self.settings.monitoring['heartbeat_interval']
-        last_pool_status_check = get_utc_now()
+        last_pool_status_check = time.monotonic()
         pool_status_check_interval = 300  # Проверка статуса пула каждые 5 минут
         
-        while self.running:
+        while not self._stop_event.is_set():
             try:
-                cycle_start = get_utc_now()
+                # Время читается один раз в начале и один раз в конце цикла
+                # и передается дальше параметром
+                now = get_utc_now()
+                tick = time.monotonic()
                 
                 # Периодическая проверка статуса пула соединений
-                if (get_utc_now() - last_pool_status_check).total_seconds() >= pool_status_check_interval:
+                if tick - last_pool_status_check >= pool_status_check_interval:
                     self._log_pool_status()
-                    last_pool_status_check = get_utc_now()
+                    last_pool_status_check = tick
                 
                 # Выбор режима обновления
                 if self.settings.data_update['smart_schedule_mode']:
-                    success = self._smart_update_cycle()
+                    success = self._smart_update_cycle(now)
                 else:
                     success = self._update_cycle()
                 
@@ -115,8 +181,10 @@ class RealTimeDataUpdater:
                     failed_attempts += 1
                     self.stats['failed_updates'] += 1
                 
+                now = get_utc_now()
+                tick = time.monotonic()
                 self.stats['total_updates'] += 1
-                self.stats['last_update_time'] = get_utc_now()
+                self.stats['last_update_time'] = now
                 
                 # Проверка максимального количества ошибок
                 if failed_attempts >= max_retries:
@@ -125,22 +193,23 @@ class RealTimeDataUpdater:
                     break
                 
                 # Heartbeat
-                if (get_utc_now() - last_heartbeat).total_seconds() >= heartbeat_interval:
+                if tick - last_heartbeat >= heartbeat_interval:
                     self._send_heartbeat()
-                    last_heartbeat = get_utc_now()
+                    last_heartbeat = tick
                 
                 # Ожидание до следующего обновления
                 if success:
                     if self.settings.data_update['smart_schedule_mode']:
-                        wait_seconds = self._calculate_next_schedule_wait()
+                        wait_seconds = self._calculate_next_schedule_wait(now)
                         self.logger.info(f"Waiting {wait_seconds}s until next schedule")
-                        time.sleep(wait_seconds)
                     else:
-                        time.sleep(self.settings.data_update['update_interval'])
+                        wait_seconds = self.settings.data_update['update_interval']
                 else:
-                    retry_delay = self.settings.data_update['retry_interval'] * min(failed_attempts, 5)
-                    self.logger.warning(f"Waiting {retry_delay}s after error (attempt {failed_attempts}/{max_retries})")
-                    time.sleep(retry_delay)
+                    wait_seconds = self.settings.data_update['retry_interval'] * min(failed_attempts, 5)
+                    self.logger.warning(f"Waiting {wait_seconds}s after error (attempt {failed_attempts}/{max_retries})")
+                
+                if self._stop_event.wait(wait_seconds):
+                    break
                 
             except KeyboardInterrupt:
                 self.logger.info("Received shutdown signal")
@@ -148,7 +217,8 @@ class RealTimeDataUpdater:
             except Exception as e:
                 self.logger.error("Unexpected error in update cycle", error=str(e))
                 failed_attempts += 1
-                time.sleep(self.settings.data_update['retry_interval'])
+                if self._stop_event.wait(self.settings.data_update['retry_interval']):
+                    break
         
         # Завершение работы
         self._shutdown()
@@ -204,11 +274,10 @@ class RealTimeDataUpdater:
     def _create_combinations(self) -> List[Dict[str, Any]]:
         """Создание комбинаций для обновления"""
         combinations = []
+        timeframes = self.settings.active_timeframes
         
-        enabled_pairs = [p for p in self.settings.currency_pairs if p.enabled]
-        
-        for pair in enabled_pairs:
-            for timeframe in self.settings.active_timeframes:
+        for pair in self.settings.enabled_pairs:
+            for timeframe in timeframes:
                 combination = {
                     'symbol': pair.symbol,
                     'symbol_id': pair.symbol_id,
@@ -226,10 +295,9 @@ class RealTimeDataUpdater:
     def _update_cycle(self) -> bool:
         """Один цикл обновления"""
         try:
-            cycle_start = get_utc_now()
+            cycle_start = time.monotonic()
             
-            # Создание комбинаций
-            combinations = self._create_combinations()
+            combinations = self._combinations
             
             # Обновление данных
             if self.settings.data_update['parallel_downloads']:
@@ -237,12 +305,13 @@ class RealTimeDataUpdater:
             else:
                 results = self._update_sequential(combinations)
             
-            # Обработка результатов
-            self._process_update_results(results)
+            # Обработка результатов: итоги считаются один раз и передаются дальше
+            successful, failed, total_candles = self._summarize_results(results)
+            self._process_update_results(successful, failed, total_candles)
             
             # Отправка уведомления
-            cycle_duration = (get_utc_now() - cycle_start).total_seconds()
-            self._send_update_notification(results, cycle_duration)
+            cycle_duration = time.monotonic() - cycle_start
+            self._send_update_notification(successful, failed, total_candles, cycle_duration)
             
             return True
             
@@ -250,31 +319,43 @@ class RealTimeDataUpdater:
             self.logger.error("Update cycle failed", error=str(e))
             return False
     
-    def _smart_update_cycle(self) -> bool:
+    def _smart_update_cycle(self, current_time: datetime) -> bool:
         """Умный цикл обновления с расписанием по таймфреймам"""
         try:
-            cycle_start = get_utc_now()
+            cycle_start = time.monotonic()
             
-            # Определение активных таймфреймов для текущего времени
-            active_timeframes = self._get_active_timeframes_now()
+            # Определение активных таймфреймов для времени начала цикла
+            active_timeframes = self._get_active_timeframes_now(current_time)
             
             if not active_timeframes:
                 self.logger.debug("No active timeframes for current time")
                 return True
             
             # Группировка комбинаций по таймфреймам
-            combinations = self._create_combinations()
-            grouped_combinations = self._group_combinations_by_timeframes(combinations, active_timeframes)
-            
-            # Обновление по группам
-            timeframe_results = []
-            for timeframe in active_timeframes:
-                if timeframe in grouped_combinations:
-                    result = self._update_timeframe_group(timeframe, grouped_combinations[timeframe])
-                    timeframe_results.append(result)
+            grouped_combinations = self._group_combinations_by_timeframes(active_timeframes)
+            
+            # Совпавшие по времени таймфреймы обновляются одним проходом: одно чтение
+            # последних свечей из БД и одна запись на цикл вместо прохода на каждую группу
+            combinations = [
+                combination
+                for timeframe_combinations in grouped_combinations.values()
+                for combination in timeframe_combinations
+            ]
+            results_by_timeframe: Dict[Timeframe, List[UpdateResult]] = {}
+            for result in self._update_parallel(combinations):
+                results_by_timeframe.setdefault(result.timeframe, []).append(result)
+            
+            # Итоги по группам
+            timeframe_results = [
+                self._summarize_timeframe_group(
+                    timeframe, grouped_combinations[timeframe], results_by_timeframe.get(timeframe, [])
+                )
+                for timeframe in active_timeframes
+                if timeframe in grouped_combinations
+            ]
             
             # Отправка уведомления
-            cycle_duration = (get_utc_now() - cycle_start).total_seconds()
+            cycle_duration = time.monotonic() - cycle_start
             self._send_smart_update_notification(active_timeframes, timeframe_results, cycle_duration)
             
             return True
@@ -285,193 +366,207 @@ class RealTimeDataUpdater:
     
     def _update_sequential(self, combinations: List[Dict[str, Any]]) -> List[UpdateResult]:
         """Последовательное обновление"""
-        results = []
+        last_times = self._get_last_candle_times(combinations)
         
         for i, combination in enumerate(combinations, 1):
-            self.logger.debug(
-                f"Updating {i}/{len(combinations)}: {combination['symbol']} {combination['timeframe'].value}"
-            )
+            if self._stdlib_logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Updating %d/%d: %s %s",
+                    i, len(combinations), combination['symbol'], combination['timeframe'].value
+                )
             
-            result = self._update_single_combination(combination)
-            results.append(result)
+            key = (combination['symbol_id'], combination['timeframe_id'])
+            if key not in last_times:
+                self._insert_queue.put((self._last_time_failed_result(combination), []))
+                continue
             
-            # Небольшая пауза между запросами
-            time.sleep(0.1)
+            self._insert_queue.put(self._update_single_combination(combination, last_times[key]))
         
-        return results
+        return self._finish_writes()
     
     def _update_parallel(self, combinations: List[Dict[str, Any]]) -> List[UpdateResult]:
         """Параллельное обновление с ограниченным количеством потоков"""
-        results = []
         
-        # Ограничиваем количество параллельных потоков для предотвращения исчерпания подключений
-        max_workers = min(self.settings.data_update['max_workers'], 3)  # Максимум 3 потока
+        self.logger.info(f"Starting parallel update with {self._max_workers} workers for {len(combinations)} combinations")
         
-        self.logger.info(f"Starting parallel update with {max_workers} workers for {len(combinations)} combinations")
+        last_times = self._get_last_candle_times(combinations)
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_combination = {
-                executor.submit(self._update_single_combination, combo): combo 
-                for combo in combinations
-            }
+        # Комбинации, для которых не удалось получить время последней свечи, не обновляются
+        for combo in combinations:
+            if (combo['symbol_id'], combo['timeframe_id']) not in last_times:
+                self._insert_queue.put((self._last_time_failed_result(combo), []))
+        
+        # Рабочие потоки сами кладут результат в очередь записи
+        future_to_combination = {
+            self._executor.submit(
+                self._update_and_enqueue,
+                combo,
+                last_times[(combo['symbol_id'], combo['timeframe_id'])]
+            ): combo 
+            for combo in combinations
+            if (combo['symbol_id'], combo['timeframe_id']) in last_times
+        }
+        
+        for future in as_completed(future_to_combination):
+            combination = future_to_combination[future]
             
-            for future in as_completed(future_to_combination):
-                combination = future_to_combination[future]
+            try:
+                future.result()
+            except Exception as e:
+                self.logger.error(
+                    "Failed to update %s %s", combination['symbol'], combination['timeframe'].value,
+                    error=str(e)
+                )
                 
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    self.logger.error(
-                        f"Failed to update {combination['symbol']} {combination['timeframe'].value}",
-                        error=str(e)
+                result = UpdateResult(
+                    symbol=combination['symbol'],
+                    timeframe=combination['timeframe'],
+                    success=False,
+                    new_candles=0,
+                    error_message=str(e)
+                )
+                self._insert_queue.put((result, []))
+        
+        return self._finish_writes()
+    
+    def _update_and_enqueue(
+        self,
+        combination: Dict[str, Any],
+        last_db_time: Optional[datetime]
+    ) -> None:
+        """Обновление комбинации с передачей строк потоку записи"""
+        # put блокируется, если запись отстает: память ограничена размером очереди
+        self._insert_queue.put(self._update_single_combination(combination, last_db_time))
+    
+    def _get_last_candle_times(
+        self,
+        combinations: List[Dict[str, Any]]
+    ) -> Dict[Tuple[int, int], Optional[datetime]]:
+        """
+        Время последних свечей всех комбинаций одним запросом с повторными попытками
+        
+        Если пакетный запрос так и не удался, время запрашивается по каждой
+        комбинации отдельно: временная ошибка БД не должна срывать весь цикл.
+        
+        Returns:
+            Словарь (symbol_id, timeframe_id) -> время последней свечи (None, если
+            свечей нет); комбинации, время которых получить не удалось, отсутствуют
+        """
+        pairs = [(combo['symbol_id'], combo['timeframe_id']) for combo in combinations]
+        db_retry_delay = 0.1  # 100ms между попытками
+        
+        for attempt in range(DB_RETRY_ATTEMPTS):
+            try:
+                last_times = self.db_manager.get_last_candle_times(pairs)
+                return {pair: last_times.get(pair) for pair in pairs}
+            except Exception as db_error:
+                if attempt < DB_RETRY_ATTEMPTS - 1:
+                    self.logger.warning(
+                        "Database retry %d/%d for last candle times: %s",
+                        attempt + 1, DB_RETRY_ATTEMPTS, db_error
                     )
-                    
-                    result = UpdateResult(
-                        symbol=combination['symbol'],
-                        timeframe=combination['timeframe'],
-                        success=False,
-                        new_candles=0,
-                        error_message=str(e)
+                    time.sleep(db_retry_delay)
+                    db_retry_delay *= 2  # Экспоненциальная задержка
+                else:
+                    self.logger.error(
+                        "Database error for last candle times after %d attempts, "
+                        "falling back to per-combination lookup: %s",
+                        DB_RETRY_ATTEMPTS, db_error
                     )
-                    results.append(result)
         
-        return results
+        last_times = {}
+        for pair in pairs:
+            try:
+                last_times[pair] = self.db_manager.get_last_candle_time(*pair)
+            except Exception as db_error:
+                self.logger.error(
+                    "Failed to get last candle time for symbol_id=%s timeframe_id=%s: %s",
+                    pair[0], pair[1], db_error
+                )
+        return last_times
+    
+    def _last_time_failed_result(self, combination: Dict[str, Any]) -> UpdateResult:
+        """Неудачный результат комбинации, время последней свечи которой неизвестно"""
+        return UpdateResult(
+            symbol=combination['symbol'],
+            timeframe=combination['timeframe'],
+            success=False,
+            new_candles=0,
+            error_message="Failed to get last candle time"
+        )
     
-    def _update_single_combination(self, combination: Dict[str, Any]) -> UpdateResult:
-        """Обновление одной комбинации с улучшенной обработкой ошибок БД"""
+    def _update_single_combination(
+        self,
+        combination: Dict[str, Any],
+        last_db_time: Optional[datetime]
+    ) -> Tuple[UpdateResult, List[Tuple]]:
+        """
+        Загрузка и обработка новых свечей одной комбинации
+        
+        Запись в БД не выполняется: строки передаются потоку записи,
+        который объединяет комбинации цикла в крупные пакеты.
+        
+        Args:
+            combination: Комбинация символа и таймфрейма
+            last_db_time: Время последней свечи в БД (загружено на весь цикл)
+        
+        Returns:
+            Предварительный результат и строки для вставки в БД
+        """
         symbol = combination['symbol']
         timeframe = combination['timeframe']
         symbol_id = combination['symbol_id']
         
         try:
-            # Получение времени последней свечи в БД с повторными попытками
-            last_db_time = None
-            max_db_retries = 3
-            db_retry_delay = 0.1  # 100ms между попытками
-            
-            for attempt in range(max_db_retries):
-                try:
-                    last_db_time = self.db_manager.get_last_candle_time(symbol_id, timeframe.id)
-                    break
-                except Exception as db_error:
-                    if attempt < max_db_retries - 1:
-                        self.logger.warning(
-                            f"Database retry {attempt + 1}/{max_db_retries} for {symbol} {timeframe.value}: {db_error}"
-                        )
-                        import time
-                        time.sleep(db_retry_delay)
-                        db_retry_delay *= 2  # Экспоненциальная задержка
-                    else:
-                        self.logger.error(f"Database error for {symbol} {timeframe.value} after {max_db_retries} attempts: {db_error}")
-                        return UpdateResult(
-                            symbol=symbol,
-                            timeframe=timeframe,
-                            success=False,
-                            new_candles=0,
-                            error_message=f"Database error: {db_error}"
-                        )
-            
             # Определение времени для запроса
             from_time = last_db_time if last_db_time else (get_utc_now() - timedelta(days=1))
             
-            # Загрузка свечей из MT5
-            candles = self.mt5_client.fetch_candles(
+            # Загрузка сырых баров из MT5 (без объектов на каждую свечу)
+            rates = self.mt5_client.fetch_rates(
                 symbol=symbol,
                 timeframe=timeframe,
                 from_time=from_time
             )
             
-            if not candles:
+            if len(rates) == 0:
                 return UpdateResult(
                     symbol=symbol,
                     timeframe=timeframe,
                     success=True,
                     new_candles=0,
                     last_candle_time=last_db_time
-                )
+                ), []
             
-            # Фильтрация новых свечей
-            new_candles = self.candle_processor.filter_new_candles(candles, last_db_time)
+            # Векторная фильтрация новых и валидация баров масками numpy
+            selected = self.candle_processor.select_rates(rates, last_db_time)
             
-            if not new_candles:
+            if len(selected) == 0:
                 return UpdateResult(
                     symbol=symbol,
                     timeframe=timeframe,
                     success=True,
                     new_candles=0,
                     last_candle_time=last_db_time
-                )
-            
-            # Валидация свечей
-            valid_candles = []
-            for candle in new_candles:
-                if self.candle_processor.validate_candle_data(candle):
-                    valid_candles.append(candle)
-            
-            if not valid_candles:
-                return UpdateResult(
-                    symbol=symbol,
-                    timeframe=timeframe,
-                    success=True,
-                    new_candles=0,
-                    last_candle_time=last_db_time
-                )
-            
-            # Обработка и вставка в БД с повторными попытками
-            processed_candles = self.candle_processor.process_mt5_candles(valid_candles, symbol_id)
-            db_tuples = self.candle_processor.convert_to_db_tuples(processed_candles)
-            
-            inserted_count = 0
-            db_retry_delay = 0.1
-            
-            for attempt in range(max_db_retries):
-                try:
-                    inserted_count = self.db_manager.insert_candles_batch(db_tuples)
-                    break
-                except Exception as db_error:
-                    if attempt < max_db_retries - 1:
-                        self.logger.warning(
-                            f"Database insert retry {attempt + 1}/{max_db_retries} for {symbol} {timeframe.value}: {db_error}"
-                        )
-                        import time
-                        time.sleep(db_retry_delay)
-                        db_retry_delay *= 2
-                    else:
-                        self.logger.error(f"Database insert error for {symbol} {timeframe.value} after {max_db_retries} attempts: {db_error}")
-                        return UpdateResult(
-                            symbol=symbol,
-                            timeframe=timeframe,
-                            success=False,
-                            new_candles=0,
-                            error_message=f"Database insert error: {db_error}"
-                        )
-            
-            # Обновление статистики
-            self._update_pair_stats(symbol, timeframe, inserted_count)
-            
-            # Новое время последней свечи
-            new_last_time = max(c.timestamp for c in valid_candles)
+                ), []
             
-            self.logger.info(
-                f"Updated {symbol} {timeframe.value}: {inserted_count} new candles",
-                symbol=symbol,
-                timeframe=timeframe.value,
-                new_candles=inserted_count,
-                last_time=new_last_time
+            db_tuples = list(
+                self.candle_processor.iter_rates_db_tuples(selected, symbol_id, timeframe)
             )
             
+            # Новое время последней свечи: select_rates возвращает бары по возрастанию времени
+            new_last_time = db_tuples[-1][2]
+            
             return UpdateResult(
                 symbol=symbol,
                 timeframe=timeframe,
                 success=True,
-                new_candles=inserted_count,
+                new_candles=len(db_tuples),
                 last_candle_time=new_last_time
-            )
+            ), db_tuples
             
         except Exception as e:
             self.logger.error(
-                f"Failed to update {symbol} {timeframe.value}",
+                "Failed to update %s %s", symbol, timeframe.value,
                 error=str(e)
             )
             
@@ -481,93 +576,252 @@ class RealTimeDataUpdater:
                 success=False,
                 new_candles=0,
                 error_message=str(e)
-            )
+            ), []
     
-    def _get_active_timeframes_now(self) -> List[Timeframe]:
-        """Получение активных таймфреймов для текущего времени"""
-        active_timeframes = []
-        current_time = get_utc_now()
+    def _finish_writes(self) -> List[UpdateResult]:
+        """
+        Завершение записи цикла
         
-        for timeframe in self.settings.active_timeframes:
-            if timeframe.name in self.settings.data_update['timeframe_schedules']:
-                schedule = self.settings.data_update['timeframe_schedules'][timeframe.name]
-                
-                if schedule.get('enabled', True):
-                    # Проверяем нужно ли обновлять этот таймфрейм сейчас
-                    if self._should_update_timeframe_now(timeframe, current_time):
-                        active_timeframes.append(timeframe)
+        Ставит в очередь маркер конца цикла и ждет, пока поток записи
+        запишет оставшиеся строки. Ожидание не бесконечно: если поток записи
+        остановился или после сигнала остановки запись не завершилась за
+        WRITE_STOP_TIMEOUT, цикл завершается ошибкой.
         
-        return active_timeframes
+        Returns:
+            Итоговые результаты обновления всех комбинаций цикла
+        """
+        if not self._writer_thread.is_alive():
+            raise RuntimeError("Candle writer thread is not running")
+        
+        done: Future = Future()
+        self._insert_queue.put(done)
+        
+        stop_deadline = None
+        while True:
+            try:
+                return done.result(timeout=WRITE_RESULT_POLL_INTERVAL)
+            except FutureTimeoutError:
+                if not self._writer_thread.is_alive():
+                    raise RuntimeError("Candle writer thread is not running")
+                if self._stop_event.is_set():
+                    if stop_deadline is None:
+                        stop_deadline = time.monotonic() + WRITE_STOP_TIMEOUT
+                    elif time.monotonic() >= stop_deadline:
+                        raise TimeoutError("Candle writes did not finish after stop signal")
     
-    def _should_update_timeframe_now(self, timeframe: Timeframe, current_time: datetime) -> bool:
-        """Проверка нужно ли обновлять таймфрейм сейчас"""
-        if timeframe.name not in self.settings.data_update['timeframe_schedules']:
-            return False
+    def _writer_loop(self) -> None:
+        """
+        Поток записи новых свечей в БД
         
-        schedule = self.settings.data_update['timeframe_schedules'][timeframe.name]
-        interval_minutes = schedule.get('interval_minutes', timeframe.minutes)
+        Строки комбинаций объединяются в пакеты примерно по INSERT_BATCH_SIZE
+        строк (комбинация не делится между пакетами); каждый пакет пишется
+        одной транзакцией. Накопленный пакет пишется также при простое
+        очереди дольше WRITE_FLUSH_INTERVAL и по маркеру конца цикла (Future),
+        которому передаются итоговые результаты цикла. None останавливает поток.
         
-        # Вычисляем время до следующего обновления
-        wait_seconds = calculate_seconds_until_next_timeframe(timeframe, current_time)
+        Непредвиденная ошибка не останавливает поток: комбинации пакета
+        считаются неудачными, а маркер конца цикла получает исключение.
+        """
+        cycle_results: List[UpdateResult] = []
+        batch_results: List[UpdateResult] = []
+        batch_rows: List[Tuple] = []
         
-        # Если до следующего обновления меньше минуты, считаем что нужно обновлять
-        return wait_seconds < 60
+        def flush() -> None:
+            nonlocal batch_results, batch_rows
+            if not batch_rows:
+                return
+            try:
+                written = self._insert_batch(batch_results, batch_rows)
+            except Exception as e:
+                self.logger.error("Candle writer failed to write batch", rows=len(batch_rows), error=str(e))
+                written = [
+                    replace(
+                        result,
+                        success=False,
+                        new_candles=0,
+                        last_candle_time=None,
+                        error_message=f"Database writer error: {e}"
+                    )
+                    for result in batch_results
+                ]
+            cycle_results.extend(written)
+            batch_results, batch_rows = [], []
+        
+        while True:
+            try:
+                item = self._insert_queue.get(timeout=WRITE_FLUSH_INTERVAL if batch_rows else None)
+            except queue.Empty:
+                # Пауза в поступлении строк - пишем накопленное
+                flush()
+                continue
+            
+            if item is None:
+                flush()
+                return
+            
+            try:
+                if isinstance(item, Future):
+                    flush()
+                    item.set_result(cycle_results)
+                    cycle_results = []
+                    continue
+                
+                result, rows = item
+                if not rows:
+                    cycle_results.append(result)
+                    continue
+                
+                batch_results.append(result)
+                batch_rows.extend(rows)
+                
+                if len(batch_rows) >= INSERT_BATCH_SIZE:
+                    flush()
+            except Exception as e:
+                self.logger.error("Candle writer error", error=str(e))
+                if isinstance(item, Future) and not item.done():
+                    item.set_exception(e)
+                    cycle_results = []
+    
+    def _insert_batch(self, batch_results: List[UpdateResult], rows: List[Tuple]) -> List[UpdateResult]:
+        """Вставка пакета строк с повторными попытками"""
+        db_retry_delay = 0.1
+        
+        for attempt in range(DB_RETRY_ATTEMPTS):
+            try:
+                if len(rows) >= COPY_MIN_ROWS:
+                    self.db_manager.copy_candles_batch(rows)
+                else:
+                    self.db_manager.insert_candles_batch(rows)
+                break
+            except Exception as db_error:
+                if attempt < DB_RETRY_ATTEMPTS - 1:
+                    self.logger.warning(
+                        "Database insert retry %d/%d: %s",
+                        attempt + 1, DB_RETRY_ATTEMPTS, db_error,
+                        rows=len(rows)
+                    )
+                    time.sleep(db_retry_delay)
+                    db_retry_delay *= 2
+                else:
+                    self.logger.error(
+                        "Database insert error after %d attempts: %s",
+                        DB_RETRY_ATTEMPTS, db_error,
+                        rows=len(rows),
+                        combinations=len(batch_results)
+                    )
+                    return [
+                        replace(
+                            result,
+                            success=False,
+                            new_candles=0,
+                            last_candle_time=None,
+                            error_message=f"Database insert error: {db_error}"
+                        )
+                        for result in batch_results
+                    ]
+        
+        # Статистика по комбинациям: количество строк каждой известно до записи
+        now = get_utc_now()
+        log_updates = self._stdlib_logger.isEnabledFor(logging.INFO)
+        for result in batch_results:
+            self._update_pair_stats(result.symbol, result.timeframe, result.new_candles, now)
+            
+            if log_updates:
+                self.logger.info(
+                    "Updated %s %s: %d new candles",
+                    result.symbol, result.timeframe.value, result.new_candles,
+                    last_time=result.last_candle_time
+                )
+        
+        return batch_results
+    
+    def _create_timeframe_schedule(self) -> List[Tuple[Timeframe, int, bool]]:
+        """Построение таблицы расписания для активных таймфреймов"""
+        schedules = self.settings.data_update['timeframe_schedules']
+        
+        return [
+            (timeframe, timeframe.seconds, schedules[timeframe.name].get('enabled', True))
+            for timeframe in self.settings.active_timeframes
+            if timeframe.name in schedules
+        ]
+    
+    def _get_active_timeframes_now(self, current_time: datetime) -> List[Timeframe]:
+        """Получение активных таймфреймов для заданного времени"""
+        timestamp = current_time.timestamp()
+        
+        # Если до следующей границы таймфрейма меньше минуты, считаем что нужно обновлять
+        return [
+            timeframe
+            for timeframe, period, enabled in self._timeframe_schedule
+            if enabled and period - timestamp % period < 60
+        ]
     
     def _group_combinations_by_timeframes(
         self, 
-        combinations: List[Dict[str, Any]], 
         active_timeframes: List[Timeframe]
     ) -> Dict[Timeframe, List[Dict[str, Any]]]:
-        """Группировка комбинаций по таймфреймам"""
-        grouped = {}
-        
-        for combination in combinations:
-            timeframe = combination['timeframe']
-            if timeframe in active_timeframes:
-                if timeframe not in grouped:
-                    grouped[timeframe] = []
-                grouped[timeframe].append(combination)
-        
-        return grouped
+        """Группировка комбинаций по таймфреймам (из готовых групп, без обхода комбинаций)"""
+        by_timeframe = self._combinations_by_timeframe
+        return {
+            timeframe: by_timeframe[timeframe]
+            for timeframe in active_timeframes
+            if timeframe in by_timeframe
+        }
     
-    def _update_timeframe_group(
+    def _summarize_timeframe_group(
         self, 
         timeframe: Timeframe, 
-        combinations: List[Dict[str, Any]]
+        combinations: List[Dict[str, Any]],
+        results: List[UpdateResult]
     ) -> Dict[str, Any]:
-        """Обновление группы комбинаций одного таймфрейма"""
-        results = self._update_parallel(combinations)
-        
-        successful = [r for r in results if r.success]
-        failed = [r for r in results if not r.success]
-        total_candles = sum(r.new_candles for r in successful)
+        """Итоги обновления группы комбинаций одного таймфрейма"""
+        successful, failed, total_candles = self._summarize_results(results)
         
         return {
             'timeframe': timeframe,
             'combinations_count': len(combinations),
-            'successful_count': len(successful),
-            'failed_count': len(failed),
+            'successful_count': successful,
+            'failed_count': failed,
             'total_candles': total_candles,
             'results': results
         }
     
-    def _process_update_results(self, results: List[UpdateResult]) -> None:
-        """Обработка результатов обновления"""
-        successful = [r for r in results if r.success]
-        failed = [r for r in results if not r.success]
+    def _summarize_results(self, results: List[UpdateResult]) -> Tuple[int, int, int]:
+        """
+        Итоги обновления за один проход по результатам
         
-        total_candles = sum(r.new_candles for r in successful)
+        Returns:
+            (успешных комбинаций, комбинаций с ошибкой, новых свечей в успешных)
+        """
+        successful = 0
+        total_candles = 0
+        
+        for result in results:
+            if result.success:
+                successful += 1
+                total_candles += result.new_candles
+        
+        return successful, len(results) - successful, total_candles
+    
+    def _process_update_results(self, successful: int, failed: int, total_candles: int) -> None:
+        """Обработка результатов обновления"""
         self.stats['total_candles'] += total_candles
         
         self.logger.info(
             "Update cycle completed",
-            total_combinations=len(results),
-            successful=len(successful),
-            failed=len(failed),
+            total_combinations=successful + failed,
+            successful=successful,
+            failed=failed,
             new_candles=total_candles
         )
     
-    def _update_pair_stats(self, symbol: str, timeframe: Timeframe, candles_count: int) -> None:
+    def _update_pair_stats(
+        self,
+        symbol: str,
+        timeframe: Timeframe,
+        candles_count: int,
+        now: datetime
+    ) -> None:
         """Обновление статистики по паре"""
         pair_key = f"{symbol}_{timeframe.value}"
         
@@ -579,7 +833,11 @@ class RealTimeDataUpdater:
             }
         
         self.stats['pair_stats'][pair_key]['total_candles'] += candles_count
-        self.stats['pair_stats'][pair_key]['last_update'] = get_utc_now()
+        self.stats['pair_stats'][pair_key]['last_update'] = now
+        
+        with self._recent_inserts_lock:
+            self._recent_inserts.append((now, candles_count))
+            self._recent_inserts_total += candles_count
     
     def _initial_history_download(self) -> None:
         """Первоначальная загрузка истории"""
@@ -588,59 +846,82 @@ class RealTimeDataUpdater:
         try:
             # Загружаем данные за последние N дней для всех комбинаций
             days_back = 7  # Можно вынести в настройки
-            start_date = get_utc_now() - timedelta(days=days_back)
-            
-            combinations = self._create_combinations()
-            
-            for combination in combinations:
+            now = get_utc_now()
+            start_date = now - timedelta(days=days_back)
+            
+            # Комбинации без данных определяются одним запросом вместо COUNT(*) на каждую;
+            # комбинации, время которых получить не удалось, пропускаются (нет в словаре)
+            last_times = self._get_last_candle_times(self._combinations)
+            missing = [
+                combination for combination in self._combinations
+                if last_times.get((combination['symbol_id'], combination['timeframe_id']), False) is None
+            ]
+            
+            for combination in missing:
                 symbol = combination['symbol']
                 timeframe = combination['timeframe']
                 symbol_id = combination['symbol_id']
                 
-                # Проверяем есть ли уже данные
-                existing_count = self.db_manager.get_candles_count(symbol_id, timeframe.id)
+                self.logger.info("Loading initial history for %s %s", symbol, timeframe.value)
                 
-                if existing_count == 0:
-                    self.logger.info(f"Loading initial history for {symbol} {timeframe.value}")
-                    
-                    candles = self.mt5_client.fetch_candles(
+                try:
+                    rates = self.mt5_client.fetch_rates(
                         symbol=symbol,
                         timeframe=timeframe,
                         from_time=start_date,
-                        to_time=get_utc_now()
+                        to_time=now
                     )
-                    
-                    if candles:
-                        valid_candles = [c for c in candles if self.candle_processor.validate_candle_data(c)]
-                        processed_candles = self.candle_processor.process_mt5_candles(valid_candles, symbol_id)
-                        db_tuples = self.candle_processor.convert_to_db_tuples(processed_candles)
-                        inserted_count = self.db_manager.insert_candles_batch(db_tuples)
-                        
-                        self.logger.info(f"Loaded {inserted_count} initial candles for {symbol} {timeframe.value}")
+                    selected = self.candle_processor.select_rates(rates)
+                    rows = list(
+                        self.candle_processor.iter_rates_db_tuples(selected, symbol_id, timeframe)
+                    )
+                    result = UpdateResult(
+                        symbol=symbol,
+                        timeframe=timeframe,
+                        success=True,
+                        new_candles=len(rows),
+                        last_candle_time=rows[-1][2] if rows else None
+                    )
+                except Exception as e:
+                    self.logger.error(
+                        "Failed to load initial history for %s %s", symbol, timeframe.value,
+                        error=str(e)
+                    )
+                    result = UpdateResult(
+                        symbol=symbol,
+                        timeframe=timeframe,
+                        success=False,
+                        new_candles=0,
+                        error_message=str(e)
+                    )
+                    rows = []
                 
-                time.sleep(0.1)  # Небольшая пауза
+                # Запись идет в потоке записи, пока загружается следующая комбинация
+                self._insert_queue.put((result, rows))
+            
+            results = self._finish_writes()
             
-            self.logger.info("Initial history download completed")
+            self.logger.info(
+                "Initial history download completed",
+                combinations=len(missing),
+                new_candles=sum(r.new_candles for r in results if r.success)
+            )
             
         except Exception as e:
             self.logger.error("Initial history download failed", error=str(e))
     
-    def _calculate_next_schedule_wait(self) -> int:
+    def _calculate_next_schedule_wait(self, current_time: datetime) -> int:
         """Вычисление времени ожидания до следующего расписания"""
-        current_time = get_utc_now()
-        min_wait = float('inf')
+        if not self._timeframe_schedule:
+            return 60
         
-        for timeframe in self.settings.active_timeframes:
-            if timeframe.name in self.settings.data_update['timeframe_schedules']:
-                wait_seconds = calculate_seconds_until_next_timeframe(timeframe, current_time)
-                min_wait = min(min_wait, wait_seconds)
-        
-        return int(min_wait) if min_wait != float('inf') else 60
+        timestamp = current_time.timestamp()
+        return int(min(period - timestamp % period for _, period, _ in self._timeframe_schedule))
     
     def _send_start_notification(self) -> None:
         """Отправка уведомления о запуске"""
         try:
-            combinations = self._create_combinations()
+            combinations = self._combinations
             symbols = list(set(c['symbol'] for c in combinations))
             timeframes = list(set(str(c['timeframe'].value) for c in combinations))
             
@@ -657,19 +938,21 @@ class RealTimeDataUpdater:
         except Exception as e:
             self.logger.error("Failed to send start notification", error=str(e))
     
-    def _send_update_notification(self, results: List[UpdateResult], duration: float) -> None:
+    def _send_update_notification(
+        self,
+        successful: int,
+        failed: int,
+        total_candles: int,
+        duration: float
+    ) -> None:
         """Отправка уведомления об обновлении"""
         try:
-            successful = [r for r in results if r.success]
-            failed = [r for r in results if not r.success]
-            total_candles = sum(r.new_candles for r in successful)
-            
             update_info = {
                 'timestamp': get_utc_now().strftime('%Y-%m-%d %H:%M:%S UTC'),
                 'duration': f"{duration:.1f}s",
                 'new_candles': total_candles,
-                'successful_pairs': len(successful),
-                'errors': len(failed)
+                'successful_pairs': successful,
+                'errors': failed
             }
             
             self.telegram.send_update_notification(update_info)
@@ -693,12 +976,12 @@ class RealTimeDataUpdater:
                 f"📈 <b>Умное обновление данных</b>\n"
                 f"🕐 {get_utc_now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n"
                 f"⏱️ Длительность: {duration:.1f}s\n"
-                f"📊 Активные таймфреймы: {', '.join(tf.value for tf in active_timeframes)}\n"
+                f"📊 Активные таймфреймы: {', '.join(tf.name for tf in active_timeframes)}\n"
                 f"💾 Новых свечей: {total_candles}\n"
                 f"✅ Успешных комбинаций: {successful_combinations}/{total_combinations}"
             )
             
-            self.telegram.send_message(message, "system")
+            self.telegram.send_message_nowait(message, "system")
             
         except Exception as e:
             self.logger.error("Failed to send smart update notification", error=str(e))
@@ -738,23 +1021,25 @@ class RealTimeDataUpdater:
             self.logger.error("Failed to send error notification", error=str(e))
     
     def _get_candles_last_hour(self) -> int:
-        """Получение количества свечей за последний час"""
-        try:
-            one_hour_ago = get_utc_now() - timedelta(hours=1)
-            total_candles = 0
-            
-            for pair_key, stats in self.stats['pair_stats'].items():
-                if stats['last_update'] and stats['last_update'] > one_hour_ago:
-                    total_candles += stats['total_candles']
-            
-            return total_candles
-        except Exception:
-            return 0
+        """
+        Получение количества свечей за последний час
+        
+        Устаревшие записи вытесняются из начала окна, сумма поддерживается
+        при добавлении и вытеснении - амортизированно O(1).
+        """
+        one_hour_ago = get_utc_now() - timedelta(hours=1)
+        
+        with self._recent_inserts_lock:
+            recent = self._recent_inserts
+            while recent and recent[0][0] <= one_hour_ago:
+                self._recent_inserts_total -= recent.popleft()[1]
+            return self._recent_inserts_total
     
     def _signal_handler(self, signum, frame):
         """Обработчик сигналов"""
         self.logger.info(f"Received signal {signum}, shutting down...")
         self.running = False
+        self._stop_event.set()
     
     def _shutdown(self) -> None:
         """Завершение работы"""
@@ -793,6 +1078,15 @@ class RealTimeDataUpdater:
         try:
             self.logger.info("Closing all connections...")
             
+            # Дожидаемся рабочих потоков обновления
+            if hasattr(self, '_executor'):
+                self._executor.shutdown(wait=True)
+            
+            # Останавливаем поток записи (накопленные строки будут записаны)
+            if hasattr(self, '_writer_thread') and self._writer_thread.is_alive():
+                self._insert_queue.put(None)
+                self._writer_thread.join()
+            
             # Закрытие соединений в правильном порядке
             if hasattr(self, 'telegram'):
                 self.telegram.close()
@@ -4,5 +4,6 @@ Utility functions and helpers
 
 from .logging import setup_logging, get_logger
 from .helpers import parse_datetime, format_datetime
+from .rate_limiter import TokenBucket
 
-__all__ = ["setup_logging", "get_logger", "parse_datetime", "format_datetime"] 
\ No newline at end of file
+__all__ = ["setup_logging", "get_logger", "parse_datetime", "format_datetime", "TokenBucket"] 
\ No newline at end of file
@@ -3,13 +3,54 @@ Helper functions for data processing
 """
 
 import re
-from typing import Union, Optional, List, Dict, Any
+from collections import ChainMap
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, Mapping, Union, Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta, time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from ..config.constants import Timeframe
 
 
+_UTC = timezone.utc
+
+# Форматы для строк с датой, которые не разбирает datetime.fromisoformat
+# (даты и время без ведущих нулей)
+_FALLBACK_DATETIME_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d'
+)
+
+# Символ валютной пары: XXX_YYY
+_SYMBOL_RE = re.compile(r'[A-Z]{3}_[A-Z]{3}')
+
+_VALID_TIMEFRAMES = frozenset({'M1', 'M5', 'M15', 'M30', 'H1', 'H4', 'D1', 'W1', 'MN1'})
+
+# Готовые строки формата для format_number по количеству знаков после запятой
+_NUMBER_FORMATS = tuple(f"{{:.{decimals}f}}" for decimals in range(16))
+
+# Размер кэша разобранных строк времени (границы свечей повторяются
+# для всех символов и таймфреймов)
+_PARSE_DATETIME_CACHE_SIZE = 4096
+
+def _ensure_utc(dt: datetime) -> datetime:
+    """
+    Приведение времени к UTC
+    
+    Время уже в UTC (основной случай) возвращается без создания нового объекта;
+    время без часового пояса считается UTC.
+    """
+    tzinfo = dt.tzinfo
+    if tzinfo is _UTC:
+        return dt
+    if tzinfo is None:
+        return dt.replace(tzinfo=_UTC)
+    return dt.astimezone(_UTC)
+
+
 def parse_datetime(time_obj: Union[str, datetime, int, float]) -> datetime:
     """
     Парсинг времени из различных форматов
@@ -22,49 +63,66 @@ def parse_datetime(time_obj: Union[str, datetime, int, float]) -> datetime:
     """
     if isinstance(time_obj, datetime):
         # Если уже datetime, убеждаемся что в UTC
-        if time_obj.tzinfo is None:
-            return time_obj.replace(tzinfo=timezone.utc)
-        return time_obj.astimezone(timezone.utc)
+        return _ensure_utc(time_obj)
     
     elif isinstance(time_obj, str):
-        # Парсим строку
-        if time_obj.endswith('Z'):
-            # ISO формат с Z
-            return datetime.fromisoformat(time_obj.replace('Z', '+00:00'))
-        elif '+' in time_obj:
-            # ISO формат с timezone
-            return datetime.fromisoformat(time_obj)
-        else:
-            # Пробуем различные форматы
-            formats = [
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%dT%H:%M:%S',
-                '%Y-%m-%dT%H:%M:%S.%f',
-                '%Y-%m-%d',
-                '%H:%M:%S'
-            ]
-            
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(time_obj, fmt)
-                    if fmt == '%H:%M:%S':
-                        # Если только время, добавляем сегодняшнюю дату
-                        today = datetime.now(timezone.utc).date()
-                        dt = datetime.combine(today, dt.time())
-                    return dt.replace(tzinfo=timezone.utc)
-                except ValueError:
-                    continue
-            
-            raise ValueError(f"Unable to parse datetime string: {time_obj}")
+        return _parse_datetime_str(time_obj)
     
     elif isinstance(time_obj, (int, float)):
         # Unix timestamp
-        return datetime.fromtimestamp(time_obj, tz=timezone.utc)
+        return datetime.fromtimestamp(time_obj, tz=_UTC)
     
     else:
         raise ValueError(f"Unsupported time format: {type(time_obj)}")
 
 
+def _parse_datetime_str(value: str) -> datetime:
+    """
+    Парсинг строки времени
+    
+    Строки с датой разбираются через кэш; строка только со временем
+    зависит от текущей даты, поэтому в кэш не попадает.
+    """
+    try:
+        return _parse_dated_str(value)
+    except ValueError:
+        pass
+    
+    try:
+        parsed_time = datetime.strptime(value, '%H:%M:%S').time()
+    except ValueError:
+        raise ValueError(f"Unable to parse datetime string: {value}") from None
+    
+    # Если только время, добавляем сегодняшнюю дату
+    return datetime.combine(datetime.now(_UTC).date(), parsed_time, tzinfo=_UTC)
+
+
+@lru_cache(maxsize=_PARSE_DATETIME_CACHE_SIZE)
+def _parse_dated_str(value: str) -> datetime:
+    """
+    Парсинг строки с датой (результат неизменяем и кэшируется)
+    
+    ISO строки (основной случай) разбираются C-реализацией datetime.fromisoformat
+    за один вызов; перебор форматов strptime остается только для прочих строк.
+    Строки без часового пояса считаются UTC.
+    """
+    try:
+        dt = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
+        dt = None
+    
+    if dt is not None:
+        return dt if dt.tzinfo is not None else dt.replace(tzinfo=_UTC)
+    
+    for fmt in _FALLBACK_DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=_UTC)
+        except ValueError:
+            continue
+    
+    raise ValueError(f"Unable to parse datetime string: {value}")
+
+
 def format_datetime(dt: datetime, format_str: str = "%Y-%m-%d %H:%M:%S") -> str:
     """
     Форматирование datetime в строку
@@ -76,14 +134,12 @@ def format_datetime(dt: datetime, format_str: str = "%Y-%m-%d %H:%M:%S") -> str:
     Returns:
         Отформатированная строка
     """
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    return dt.strftime(format_str)
+    return _ensure_utc(dt).strftime(format_str)
 
 
 def get_utc_now() -> datetime:
     """Получить текущее время в UTC"""
-    return datetime.now(timezone.utc)
+    return datetime.now(_UTC)
 
 
 def round_to_timeframe(dt: datetime, timeframe: Timeframe) -> datetime:
@@ -97,19 +153,12 @@ def round_to_timeframe(dt: datetime, timeframe: Timeframe) -> datetime:
     Returns:
         Округленное время
     """
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    
-    minutes = timeframe.minutes
+    # Границы таймфреймов кратны их длительности от начала эпохи:
+    # округление целочисленным делением секунд, один новый объект datetime
+    period = timeframe.seconds
+    seconds = int(_ensure_utc(dt).timestamp())
     
-    # Округляем до минут
-    dt = dt.replace(second=0, microsecond=0)
-    
-    # Округляем до границы таймфрейма
-    total_minutes = dt.hour * 60 + dt.minute
-    rounded_minutes = (total_minutes // minutes) * minutes
-    
-    return dt.replace(hour=rounded_minutes // 60, minute=rounded_minutes % 60)
+    return datetime.fromtimestamp(seconds - seconds % period, tz=_UTC)
 
 
 def get_timeframe_boundaries(
@@ -126,8 +175,7 @@ def get_timeframe_boundaries(
     Returns:
         Кортеж (начало_таймфрейма, конец_таймфрейма)
     """
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
+    dt = _ensure_utc(dt)
     
     start = round_to_timeframe(dt, timeframe)
     end = start + timedelta(minutes=timeframe.minutes)
@@ -152,12 +200,9 @@ def calculate_seconds_until_next_timeframe(
     if current_time is None:
         current_time = get_utc_now()
     
-    if current_time.tzinfo is None:
-        current_time = current_time.replace(tzinfo=timezone.utc)
-    
-    next_boundary = round_to_timeframe(current_time, timeframe) + timedelta(minutes=timeframe.minutes)
-    
-    return int((next_boundary - current_time).total_seconds())
+    # Остаток до границы в секундах от начала эпохи - без промежуточных datetime и timedelta
+    period = timeframe.seconds
+    return int(period - _ensure_utc(current_time).timestamp() % period)
 
 
 def is_market_open(
@@ -179,8 +224,7 @@ def is_market_open(
     if current_time is None:
         current_time = get_utc_now()
     
-    if current_time.tzinfo is None:
-        current_time = current_time.replace(tzinfo=timezone.utc)
+    current_time = _ensure_utc(current_time)
     
     current_time_only = current_time.time()
     
@@ -202,9 +246,7 @@ def validate_symbol(symbol: str) -> bool:
     Returns:
         True если символ валиден
     """
-    # Паттерн для валютных пар: XXX_YYY
-    pattern = r'^[A-Z]{3}_[A-Z]{3}$'
-    return bool(re.match(pattern, symbol))
+    return _SYMBOL_RE.fullmatch(symbol) is not None
 
 
 def validate_timeframe(timeframe_str: str) -> bool:
@@ -217,8 +259,7 @@ def validate_timeframe(timeframe_str: str) -> bool:
     Returns:
         True если таймфрейм валиден
     """
-    valid_timeframes = ['M1', 'M5', 'M15', 'M30', 'H1', 'H4', 'D1', 'W1', 'MN1']
-    return timeframe_str in valid_timeframes
+    return timeframe_str in _VALID_TIMEFRAMES
 
 
 def chunk_list(lst: List[Any], chunk_size: int) -> List[List[Any]]:
@@ -235,6 +276,27 @@ def chunk_list(lst: List[Any], chunk_size: int) -> List[List[Any]]:
     return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
 
 
+def chunk_iter(items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """
+    Ленивое разбиение на чанки
+    
+    Чанки создаются по мере итерации, поэтому подходит для генераторов
+    и больших последовательностей: в памяти одновременно только один чанк.
+    
+    Args:
+        items: Исходная последовательность или итератор
+        chunk_size: Размер чанка
+        
+    Returns:
+        Итератор по чанкам
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}")
+    
+    iterator = iter(items)
+    return iter(lambda: list(islice(iterator, chunk_size)), [])
+
+
 def safe_float(value: Any, default: float = 0.0) -> float:
     """
     Безопасное преобразование в float
@@ -246,6 +308,15 @@ def safe_float(value: Any, default: float = 0.0) -> float:
     Returns:
         float значение
     """
+    # Частые случаи без исключений: пропуск значения и уже числовой тип
+    if value is None:
+        return default
+    value_type = type(value)
+    if value_type is float:
+        return value
+    if value_type is int:
+        return float(value)
+    
     try:
         return float(value)
     except (ValueError, TypeError):
@@ -263,6 +334,12 @@ def safe_int(value: Any, default: int = 0) -> int:
     Returns:
         int значение
     """
+    # Частые случаи без исключений: пропуск значения и уже целый тип
+    if value is None:
+        return default
+    if type(value) is int:
+        return value
+    
     try:
         return int(value)
     except (ValueError, TypeError):
@@ -296,6 +373,8 @@ def format_number(number: float, decimals: int = 5) -> str:
     Returns:
         Отформатированная строка
     """
+    if 0 <= decimals < len(_NUMBER_FORMATS):
+        return _NUMBER_FORMATS[decimals].format(number)
     return f"{number:.{decimals}f}"
 
 
@@ -315,23 +394,39 @@ def merge_dicts(*dicts: Dict[str, Any]) -> Dict[str, Any]:
     return result
 
 
-@dataclass
+def merge_dicts_view(*dicts: Mapping[str, Any]) -> Mapping[str, Any]:
+    """
+    Объединение словарей без копирования (только для чтения)
+    
+    Как и в merge_dicts, при совпадении ключей побеждает последний словарь.
+    Изменения исходных словарей видны через представление.
+    
+    Args:
+        *dicts: Словари для объединения
+        
+    Returns:
+        Представление объединенных словарей
+    """
+    return ChainMap(*reversed(dicts))
+
+
+@dataclass(slots=True, frozen=True)
 class TimeRange:
-    """Диапазон времени"""
+    """Диапазон времени (неизменяемый, границы приводятся к UTC)"""
     start: datetime
     end: datetime
+    _duration_seconds: int = field(init=False, repr=False, compare=False)
     
     def __post_init__(self):
-        if self.start.tzinfo is None:
-            self.start = self.start.replace(tzinfo=timezone.utc)
-        if self.end.tzinfo is None:
-            self.end = self.end.replace(tzinfo=timezone.utc)
+        start = _ensure_utc(self.start)
+        end = _ensure_utc(self.end)
+        object.__setattr__(self, 'start', start)
+        object.__setattr__(self, 'end', end)
+        object.__setattr__(self, '_duration_seconds', int((end - start).total_seconds()))
     
     def contains(self, dt: datetime) -> bool:
         """Проверить содержит ли диапазон указанное время"""
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return self.start <= dt <= self.end
+        return self.start <= _ensure_utc(dt) <= self.end
     
     def duration(self) -> timedelta:
         """Получить длительность диапазона"""
@@ -339,4 +434,4 @@ class TimeRange:
     
     def duration_seconds(self) -> int:
         """Получить длительность в секундах"""
-        return int(self.duration().total_seconds()) 
\ No newline at end of file
+        return self._duration_seconds
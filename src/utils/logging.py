@@ -2,41 +2,87 @@
 Logging configuration and setup
 """
 
+import atexit
 import logging
 import logging.handlers
+import os
+import queue
 import sys
+import time
+from functools import lru_cache
 from typing import Dict, Any, Optional
-from datetime import datetime, timezone
 import structlog
 
 from ..config.settings import get_settings
 
 
-def setup_logging(config: Dict[str, Any]) -> None:
+# Цепочка процессоров structlog общая для всех вариантов настройки
+# (TimeStamper по умолчанию пишет время в UTC)
+_PROCESSORS = (
+    structlog.stdlib.filter_by_level,
+    structlog.stdlib.add_logger_name,
+    structlog.stdlib.add_log_level,
+    structlog.stdlib.PositionalArgumentsFormatter(),
+    structlog.processors.TimeStamper(fmt="iso", utc=True),
+    structlog.processors.StackInfoRenderer(),
+    structlog.processors.format_exc_info,
+    structlog.processors.UnicodeDecoder(),
+    structlog.processors.JSONRenderer()
+)
+
+LOGS_DIR = 'logs'
+LOG_FILE = os.path.join(LOGS_DIR, 'trading_system.log')
+
+# Папка логов создается один раз за процесс, даже при повторной настройке
+_logs_dir_ready = False
+
+
+def _ensure_logs_dir() -> None:
+    """Создание папки логов при первой настройке"""
+    global _logs_dir_ready
+    if not _logs_dir_ready:
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        _logs_dir_ready = True
+
+
+# Фоновый поток записи логов: консольный и файловый обработчики работают в нем,
+# вызывающие потоки только кладут запись в очередь
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_queue_listener() -> None:
+    """Остановка потока записи логов (оставшиеся в очереди записи дописываются)"""
+    global _queue_listener
+    if _queue_listener is None:
+        return
+    
+    _queue_listener.stop()
+    for handler in _queue_listener.handlers:
+        handler.close()
+    _queue_listener = None
+
+
+atexit.register(_stop_queue_listener)
+
+
+def _configure_logging(config: Dict[str, Any], formatter: logging.Formatter) -> None:
     """
-    Настройка логирования
+    Общая настройка structlog и обработчиков корневого логгера
     
     Args:
         config: Словарь с конфигурацией логирования
+        formatter: Форматтер для консольного и файлового обработчиков
     """
     # Настройка structlog
     structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
-        ],
+        processors=list(_PROCESSORS),
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
+    # Логгеры, выданные до перенастройки, могли закэшировать прежнюю конфигурацию
+    get_logger.cache_clear()
     
     # Настройка базового логгера
     root_logger = logging.getLogger()
@@ -45,36 +91,40 @@ def setup_logging(config: Dict[str, Any]) -> None:
     # Очистка существующих обработчиков
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
-    
-    # Создание форматтера
-    formatter = logging.Formatter(
-        config.get('format', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    )
+    _stop_queue_listener()
     
     # Консольный обработчик
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.DEBUG)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # Файловый обработчик с ротацией
     try:
-        import os
         # Создаем папку logs если её нет
-        os.makedirs('logs', exist_ok=True)
+        _ensure_logs_dir()
         
         file_handler = logging.handlers.RotatingFileHandler(
-            'logs/trading_system.log',
+            LOG_FILE,
             maxBytes=config.get('max_file_size', 10*1024*1024),  # 10MB
             backupCount=config.get('backup_count', 5),
             encoding='utf-8'
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except Exception as e:
         print(f"Warning: Could not setup file logging: {e}")
     
+    # Запись в консоль и файл выполняется в фоновом потоке
+    global _queue_listener
+    log_queue: queue.Queue = queue.Queue(-1)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _queue_listener.start()
+    
     # Настройка логгеров для внешних библиотек
     logging.getLogger('urllib3').setLevel(logging.WARNING)
     logging.getLogger('requests').setLevel(logging.WARNING)
@@ -82,78 +132,43 @@ def setup_logging(config: Dict[str, Any]) -> None:
     logging.getLogger('MetaTrader5').setLevel(logging.WARNING)
 
 
-def setup_utc_logging(config: Dict[str, Any]) -> None:
+def setup_logging(config: Dict[str, Any]) -> None:
     """
-    Настройка логирования с UTC временем
+    Настройка логирования
     
     Args:
         config: Словарь с конфигурацией логирования
     """
-    # Настройка structlog с UTC временем
-    structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso", utc=True),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
-        ],
-        context_class=dict,
-        logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
-        cache_logger_on_first_use=True,
+    formatter = logging.Formatter(
+        config.get('format', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     )
+    _configure_logging(config, formatter)
+
+
+def setup_utc_logging(config: Dict[str, Any]) -> None:
+    """
+    Настройка логирования с UTC временем
     
-    # Настройка базового логгера
-    root_logger = logging.getLogger()
-    root_logger.setLevel(getattr(logging, config.get('level', 'INFO').upper()))
-    
-    # Очистка существующих обработчиков
-    for handler in root_logger.handlers[:]:
-        root_logger.removeHandler(handler)
-    
-    # Создание форматтера с UTC временем
+    Args:
+        config: Словарь с конфигурацией логирования
+    """
+    # Создание форматтера с UTC временем (time.gmtime без промежуточных объектов datetime)
     formatter = logging.Formatter(
         '%(asctime)s UTC - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    formatter.converter = lambda *args: datetime.now(timezone.utc).timetuple()
-    
-    # Консольный обработчик
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.DEBUG)
-    console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
-    
-    # Файловый обработчик с ротацией
-    try:
-        file_handler = logging.handlers.RotatingFileHandler(
-            'logs/trading_system.log',
-            maxBytes=config.get('max_file_size', 10*1024*1024),  # 10MB
-            backupCount=config.get('backup_count', 5),
-            encoding='utf-8'
-        )
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
-    except Exception as e:
-        print(f"Warning: Could not setup file logging: {e}")
-    
-    # Настройка логгеров для внешних библиотек
-    logging.getLogger('urllib3').setLevel(logging.WARNING)
-    logging.getLogger('requests').setLevel(logging.WARNING)
-    logging.getLogger('psycopg2').setLevel(logging.WARNING)
-    logging.getLogger('MetaTrader5').setLevel(logging.WARNING)
+    formatter.converter = time.gmtime
+    _configure_logging(config, formatter)
 
 
+@lru_cache(maxsize=256)
 def get_logger(name: str) -> structlog.BoundLogger:
     """
     Получение логгера с именем
     
+    Логгер кэшируется по имени: компоненты одного модуля используют
+    общий экземпляр. Кэш сбрасывается при настройке логирования.
+    
     Args:
         name: Имя логгера
         
@@ -185,20 +200,27 @@ def log_function_call(func_name: str, **kwargs):
         **kwargs: Аргументы функции
     """
     def decorator(func):
+        logger = get_logger(func.__module__)
+        # Уровень проверяется у stdlib логгера: при выключенном INFO
+        # записи о вызове не собираются
+        stdlib_logger = logging.getLogger(func.__module__)
+        
         def wrapper(*args, **kwds):
-            logger = get_logger(func.__module__)
-            logger.info(
-                f"Calling {func_name}",
-                function=func_name,
-                args=args,
-                kwargs=kwds
-            )
-            try:
-                result = func(*args, **kwds)
+            log_calls = stdlib_logger.isEnabledFor(logging.INFO)
+            if log_calls:
                 logger.info(
-                    f"{func_name} completed successfully",
-                    function=func_name
+                    f"Calling {func_name}",
+                    function=func_name,
+                    args=args,
+                    kwargs=kwds
                 )
+            try:
+                result = func(*args, **kwds)
+                if log_calls:
+                    logger.info(
+                        f"{func_name} completed successfully",
+                        function=func_name
+                    )
                 return result
             except Exception as e:
                 logger.error(
@@ -0,0 +1,72 @@
+"""
+Rate limiting utilities
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов по алгоритму token bucket"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Инициализация ограничителя
+
+        Args:
+            rate: Скорость пополнения (токенов в секунду)
+            capacity: Максимальный запас токенов (размер всплеска)
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        if capacity < 1:
+            raise ValueError(f"Capacity must be at least 1, got {capacity}")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Резервирование токенов
+
+        Запас может уйти в минус: следующий вызов подождет, пока долг
+        не будет погашен, поэтому потоки обслуживаются в порядке очереди.
+
+        Returns:
+            Время ожидания в секундах до момента, когда токены будут доступны
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._timestamp) * self.rate
+            )
+            self._timestamp = now
+            self._tokens -= tokens
+
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: int = 1, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        Получение токенов (блокирует только при исчерпании запаса)
+
+        Args:
+            tokens: Количество токенов
+            stop_event: Событие остановки, прерывающее ожидание
+
+        Returns:
+            False если ожидание прервано событием остановки
+        """
+        delay = self._reserve(tokens)
+        if delay <= 0:
+            return True
+        if stop_event is None:
+            time.sleep(delay)
+            return True
+        return not stop_event.wait(delay)
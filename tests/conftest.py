@@ -0,0 +1,131 @@
+"""
+Pytest configuration
+"""
+
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Добавляем корень проекта в путь для импорта
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Пакет MetaTrader5 есть только под Windows. Вне её подставляем пустой модуль,
+# чтобы импортировать проект; тесты задают нужные функции терминала через monkeypatch
+if importlib.util.find_spec("MetaTrader5") is None:
+    _mt5_stub = types.ModuleType("MetaTrader5")
+    _mt5_stub.TIMEFRAME_M5 = 5
+    sys.modules["MetaTrader5"] = _mt5_stub
+
+
+# Структура массива баров, который возвращают copy_rates_*
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+    ('close', '<f8'), ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+RATES_START = 1_704_067_200  # 2024-01-01 00:00:00 UTC
+
+
+@pytest.fixture
+def make_rates():
+    """
+    Фабрика массивов баров M5 в формате MT5
+    
+    make(count, start) - count валидных баров с шагом M5 от start;
+    make(bars=[...]) - бары из кортежей (смещение в барах M5, open, high, low, close, volume).
+    """
+    def make(count: int = 0, start: int = RATES_START, bars=None) -> np.ndarray:
+        if bars is not None:
+            rates = np.zeros(len(bars), dtype=RATES_DTYPE)
+            for i, (offset, open_, high, low, close, volume) in enumerate(bars):
+                rates[i] = (start + offset * 300, open_, high, low, close, volume, 0, 0)
+            return rates
+        
+        rates = np.zeros(count, dtype=RATES_DTYPE)
+        rates['time'] = start + np.arange(count) * 300
+        rates['open'] = rates['close'] = 1.1
+        rates['high'] = 1.2
+        rates['low'] = 1.0
+        return rates
+    
+    return make
+
+
+class FakeComponent:
+    """Заглушка подключения (БД, MT5, Telegram) для объектов верхнего уровня"""
+    
+    def __init__(self, config):
+        self.config = config
+    
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def settings():
+    """Настройки с минимальными обязательными полями"""
+    from src.config.settings import Settings
+    
+    return Settings(
+        postgres_password="test",
+        mt5_terminal_path="test",
+        telegram_token="test",
+        telegram_chat_id="test"
+    )
+
+
+@pytest.fixture
+def make_component(monkeypatch, settings):
+    """
+    Создание объектов проекта через их конструкторы без внешних подключений
+    
+    Терминал MT5 подменяется (известен только символ EURUSD), а у загрузчика
+    и обновлятеля подключения к БД, MT5 и Telegram заменяются FakeComponent.
+    Созданные объекты закрываются после теста.
+    
+    make(MT5Client) - клиент с конфигурацией {};
+    make(HistoricalDataLoader, start_date, end_date) и make(RealTimeDataUpdater) -
+    с настройками из фикстуры settings.
+    """
+    from src.core import mt5_client as mt5_client_module
+    from src.data import historical_loader as historical_loader_module
+    from src.data import real_time_updater as real_time_updater_module
+    
+    mt5 = mt5_client_module.mt5
+    terminal = {
+        'initialize': lambda **kwargs: True,
+        'shutdown': lambda: None,
+        'symbols_get': lambda: [types.SimpleNamespace(name='EURUSD')],
+        'symbol_info': lambda symbol: types.SimpleNamespace(visible=True),
+        'symbol_select': lambda symbol, enable: True,
+        'terminal_info': lambda: object(),
+        'last_error': lambda: (1, 'Success'),
+    }
+    for name, function in terminal.items():
+        monkeypatch.setattr(mt5, name, function, raising=False)
+    
+    for module in (historical_loader_module, real_time_updater_module):
+        for name in ('DatabaseManager', 'MT5Client', 'TelegramNotifier'):
+            monkeypatch.setattr(module, name, FakeComponent)
+    # Обработчики сигналов ставятся только из главного потока приложения
+    monkeypatch.setattr(real_time_updater_module.signal, 'signal', lambda signum, handler: None)
+    
+    components = []
+    
+    def make(cls, *args, **kwargs):
+        if cls is mt5_client_module.MT5Client:
+            component = cls(*(args or ({},)), **kwargs)
+        else:
+            component = cls(settings, *args, **kwargs)
+        components.append(component)
+        return component
+    
+    yield make
+    
+    for component in reversed(components):
+        component.close()
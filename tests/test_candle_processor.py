@@ -0,0 +1,137 @@
+"""
+Tests for CandleProcessor vectorized rates processing
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from src.config.constants import Timeframe
+from src.core.mt5_client import MT5Candle
+from src.data.candle_processor import CandleProcessor
+
+START = 1_704_067_200  # 2024-01-01 00:00:00 UTC
+
+
+@pytest.fixture
+def processor():
+    return CandleProcessor()
+
+
+def test_select_rates_drops_invalid_bars(processor, make_rates):
+    rates = make_rates(bars=[
+        (0, 1.1, 1.2, 1.0, 1.15, 10),
+        (1, 1.1, 1.0, 1.2, 1.15, 10),           # high < low
+        (2, 1.3, 1.2, 1.0, 1.15, 10),           # open > high
+        (3, 0.0, 1.2, 0.0, 1.15, 10),           # нулевые цены
+        (4, np.nan, 1.2, 1.0, 1.15, 10),        # NaN
+        (5, 1.1, 1.2, 1.0, 1.15, 0),
+    ])
+    
+    selected = processor.select_rates(rates)
+    
+    assert ((selected['time'] - START) // 300).tolist() == [0, 5]
+
+
+@pytest.mark.parametrize("tzinfo", [timezone.utc, None])
+def test_select_rates_keeps_bars_after_last_db_time(processor, make_rates, tzinfo):
+    rates = make_rates(bars=[(i, 1.1, 1.2, 1.0, 1.15, 10) for i in range(5)])
+    last_db_time = datetime.fromtimestamp(START + 2 * 300, tz=timezone.utc).replace(tzinfo=tzinfo)
+    
+    selected = processor.select_rates(rates, last_db_time)
+    
+    assert ((selected['time'] - START) // 300).tolist() == [3, 4]
+
+
+def test_select_rates_sorts_and_keeps_first_duplicate(processor, make_rates):
+    rates = make_rates(bars=[
+        (2, 1.1, 1.2, 1.0, 1.15, 10),
+        (0, 1.1, 1.2, 1.0, 1.15, 10),
+        (2, 1.12, 1.2, 1.0, 1.15, 20),
+        (1, 1.1, 1.2, 1.0, 1.15, 10),
+    ])
+    
+    selected = processor.select_rates(rates)
+    
+    assert ((selected['time'] - START) // 300).tolist() == [0, 1, 2]
+    assert selected['tick_volume'].tolist() == [10, 10, 10]
+
+
+def test_select_rates_empty(processor, make_rates):
+    assert len(processor.select_rates(make_rates(bars=[]))) == 0
+
+
+def test_iter_rates_db_tuples_uses_python_types(processor, make_rates):
+    rates = make_rates(bars=[(0, 1.1, 1.2, 1.0, 1.15, 10)])
+    
+    rows = list(processor.iter_rates_db_tuples(rates, np.int64(7), Timeframe.H1))
+    
+    assert rows == [(7, Timeframe.H1.id, datetime(2024, 1, 1, tzinfo=timezone.utc), 1.1, 1.2, 1.0, 1.15, 10)]
+    assert [type(value) for value in rows[0]] == [int, int, datetime, float, float, float, float, int]
+
+
+def test_rates_path_matches_candle_objects_path(processor, make_rates):
+    rates = make_rates(bars=[
+        (0, 1.1, 1.2, 1.0, 1.15, 10),
+        (1, 1.1, 1.0, 1.2, 1.15, 10),
+        (2, 1.11, 1.21, 1.01, 1.16, 11),
+        (3, 1.12, 1.22, 1.02, 1.17, 12),
+    ])
+    last_db_time = datetime.fromtimestamp(START, tz=timezone.utc)
+    
+    candles = [
+        MT5Candle(
+            'EUR_USD', Timeframe.M5, datetime.fromtimestamp(int(rate['time']), tz=timezone.utc),
+            float(rate['open']), float(rate['high']), float(rate['low']),
+            float(rate['close']), int(rate['tick_volume'])
+        )
+        for rate in rates
+    ]
+    candles = processor.remove_duplicates(
+        processor.filter_new_candles(processor.filter_valid_candles(candles), last_db_time)
+    )
+    expected = processor.convert_to_db_tuples(processor.process_mt5_candles(candles, 1))
+    
+    assert processor.process_rates(rates, 1, Timeframe.M5, last_db_time) == expected
+
+
+def _candles(offsets):
+    return [
+        MT5Candle(
+            'EUR_USD', Timeframe.M5, datetime.fromtimestamp(START + offset * 300, tz=timezone.utc),
+            1.1, 1.2, 1.0, 1.15, 10
+        )
+        for offset in offsets
+    ]
+
+
+def test_filter_new_candles_handles_unsorted_input_by_default(processor):
+    candles = _candles([3, 0, 4, 1, 2])
+    last_db_time = datetime.fromtimestamp(START + 2 * 300, tz=timezone.utc)
+    
+    new_candles = processor.filter_new_candles(candles, last_db_time)
+    
+    assert [c.timestamp for c in new_candles] == [candles[0].timestamp, candles[2].timestamp]
+
+
+def test_filter_new_candles_sorted_fast_path(processor):
+    candles = _candles(range(5))
+    last_db_time = datetime.fromtimestamp(START + 2 * 300, tz=timezone.utc)
+    
+    assert processor.filter_new_candles(candles, last_db_time, assume_sorted=True) == candles[3:]
+    assert processor.filter_new_candles(candles, last_db_time) == candles[3:]
+
+
+def test_group_candles_by_timeframe(processor):
+    m5 = _candles([2, 0, 1])
+    h1 = [
+        MT5Candle('EUR_USD', Timeframe.H1, candle.timestamp, 1.1, 1.2, 1.0, 1.15, 10)
+        for candle in _candles([0])
+    ]
+    
+    grouped = processor.group_candles_by_timeframe(m5 + h1)
+    
+    assert set(grouped) == {Timeframe.M5, Timeframe.H1}
+    assert grouped[Timeframe.M5] == sorted(m5, key=lambda c: c.timestamp)
+    assert grouped[Timeframe.H1] == h1
@@ -0,0 +1,149 @@
+"""
+Tests for DatabaseManager COPY helpers
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.core import database as database_module
+from src.core.database import _CopyRowsReader
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _rows(count: int):
+    return [
+        (1, 3, START + timedelta(minutes=5 * i), 1.1 + i / 1000, 1.2, 1.0, 1.15, 10 + i)
+        for i in range(count)
+    ]
+
+
+def test_copy_reader_formats_rows_with_sequence():
+    reader = _CopyRowsReader(_rows(2))
+    
+    lines = reader.read().splitlines()
+    
+    assert lines == [
+        "1\t3\t2024-01-01T00:00:00+00:00\t1.1\t1.2\t1.0\t1.15\t10\t1",
+        "1\t3\t2024-01-01T00:05:00+00:00\t1.101\t1.2\t1.0\t1.15\t11\t2",
+    ]
+    assert reader.row_count == 2
+    assert reader.read() == ''
+
+
+def test_copy_reader_chunked_reads_match_full_read():
+    full = _CopyRowsReader(_rows(50)).read()
+    
+    reader = _CopyRowsReader(iter(_rows(50)))
+    chunks = []
+    while True:
+        chunk = reader.read(37)
+        if not chunk:
+            break
+        assert len(chunk) <= 37
+        chunks.append(chunk)
+    
+    assert ''.join(chunks) == full
+    assert reader.row_count == 50
+
+
+class FakeCursor:
+    """Курсор, запоминающий запросы и данные COPY"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def execute(self, query, params=None):
+        self.connection.statements.append(query)
+        if query == database_module._CANDLES_UPSERT_FROM_STAGING_SQL:
+            self.rowcount = len({tuple(fields[:3]) for fields in self.connection.copied})
+    
+    def copy_expert(self, sql, file, size=8192):
+        self.connection.statements.append(sql)
+        data = ''
+        while True:
+            chunk = file.read(size)
+            if not chunk:
+                break
+            data += chunk
+        self.connection.copied = [line.split('\t') for line in data.splitlines()]
+
+
+class FakeConnection:
+    closed = False
+    
+    def __init__(self):
+        self.statements = []
+        self.copied = []
+        self.committed = False
+    
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+    
+    def commit(self):
+        self.committed = True
+    
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, **kwargs):
+        self.connection = FakeConnection()
+    
+    def getconn(self):
+        return self.connection
+    
+    def putconn(self, conn):
+        pass
+
+
+@pytest.fixture
+def db_manager(monkeypatch):
+    monkeypatch.setattr(database_module.pool, 'ThreadedConnectionPool', FakePool)
+    return database_module.DatabaseManager({
+        'host': 'localhost', 'port': 5432, 'database': 'test', 'user': 'test', 'password': 'test'
+    })
+
+
+def test_copy_candles_batch_streams_rows_into_staging_upsert(db_manager):
+    first, second = _rows(2)
+    duplicate = (np.int64(1), Decimal(3), first[2], Decimal('2.0'), np.float64(2.1), 1.9, 2.05, np.int64(99))
+    
+    count = db_manager.copy_candles_batch([first, second, duplicate])
+    
+    connection = db_manager.connection_pool.connection
+    assert connection.statements == [
+        database_module._CANDLES_STAGING_DDL,
+        database_module._CANDLES_COPY_SQL,
+        database_module._CANDLES_UPSERT_FROM_STAGING_SQL,
+    ]
+    assert connection.copied == [
+        ['1', '3', '2024-01-01T00:00:00+00:00', '1.1', '1.2', '1.0', '1.15', '10', '1'],
+        ['1', '3', '2024-01-01T00:05:00+00:00', '1.101', '1.2', '1.0', '1.15', '11', '2'],
+        ['1', '3', '2024-01-01T00:00:00+00:00', '2.0', '2.1', '1.9', '2.05', '99', '3'],
+    ]
+    assert connection.committed
+    assert count == 2
+    
+    # Дубликат получил больший seq, поэтому DISTINCT ON ... seq DESC оставит его,
+    # как и insert_candles_batch
+    assert '"timestamp", seq DESC' in database_module._CANDLES_UPSERT_FROM_STAGING_SQL
+
+
+def test_copy_reader_writes_null_for_missing_values():
+    row = (1, 3, START, None, 1.2, 1.0, 1.15, None)
+    
+    line = _CopyRowsReader([row]).read()
+    
+    assert line == "1\t3\t2024-01-01T00:00:00+00:00\t\\N\t1.2\t1.0\t1.15\t\\N\t1\n"
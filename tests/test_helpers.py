@@ -0,0 +1,100 @@
+"""
+Tests for timeframe helpers
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.config.constants import Timeframe
+from src.utils import helpers as helpers_module
+from src.utils.helpers import (
+    calculate_seconds_until_next_timeframe, get_timeframe_boundaries, round_to_timeframe
+)
+
+UTC = timezone.utc
+
+
+@pytest.mark.parametrize("timeframe,expected", [
+    (Timeframe.M5, datetime(2024, 3, 15, 13, 45, tzinfo=UTC)),
+    (Timeframe.M15, datetime(2024, 3, 15, 13, 45, tzinfo=UTC)),
+    (Timeframe.M30, datetime(2024, 3, 15, 13, 30, tzinfo=UTC)),
+    (Timeframe.H1, datetime(2024, 3, 15, 13, 0, tzinfo=UTC)),
+    (Timeframe.H4, datetime(2024, 3, 15, 12, 0, tzinfo=UTC)),
+    (Timeframe.D1, datetime(2024, 3, 15, 0, 0, tzinfo=UTC)),
+])
+def test_round_to_timeframe(timeframe, expected):
+    dt = datetime(2024, 3, 15, 13, 47, 29, 123456, tzinfo=UTC)
+    
+    assert round_to_timeframe(dt, timeframe) == expected
+
+
+@pytest.mark.parametrize("timeframe", list(Timeframe))
+def test_round_to_timeframe_keeps_boundary(timeframe):
+    boundary = datetime(2024, 3, 15, tzinfo=UTC)
+    
+    assert round_to_timeframe(boundary, timeframe) == boundary
+    assert round_to_timeframe(boundary - timedelta(microseconds=1), timeframe) == (
+        boundary - timedelta(minutes=timeframe.minutes)
+    )
+
+
+def test_round_to_timeframe_naive_and_offset_times():
+    expected = datetime(2024, 3, 15, 12, 0, tzinfo=UTC)
+    
+    # Наивное время считается UTC, время с другим поясом приводится к UTC
+    assert round_to_timeframe(datetime(2024, 3, 15, 13, 47), Timeframe.H4) == expected
+    moscow = timezone(timedelta(hours=3))
+    assert round_to_timeframe(datetime(2024, 3, 15, 16, 47, tzinfo=moscow), Timeframe.H4) == expected
+
+
+def test_round_to_timeframe_before_epoch():
+    dt = datetime(1969, 12, 31, 23, 58, tzinfo=UTC)
+    
+    assert round_to_timeframe(dt, Timeframe.M5) == datetime(1969, 12, 31, 23, 55, tzinfo=UTC)
+
+
+def test_get_timeframe_boundaries():
+    start, end = get_timeframe_boundaries(datetime(2024, 3, 15, 13, 47, tzinfo=UTC), Timeframe.M30)
+    
+    assert (start, end) == (
+        datetime(2024, 3, 15, 13, 30, tzinfo=UTC),
+        datetime(2024, 3, 15, 14, 0, tzinfo=UTC)
+    )
+
+
+@pytest.mark.parametrize("current_time,timeframe,expected", [
+    (datetime(2024, 3, 15, 13, 47, 0, tzinfo=UTC), Timeframe.M5, 180),
+    (datetime(2024, 3, 15, 13, 47, 29, 500000, tzinfo=UTC), Timeframe.M5, 150),
+    (datetime(2024, 3, 15, 13, 47, 0, tzinfo=UTC), Timeframe.H4, 7980),
+    (datetime(2024, 3, 15, 23, 59, 59, tzinfo=UTC), Timeframe.D1, 1),
+    (datetime(2024, 3, 15, 13, 47, 0), Timeframe.H1, 780),
+])
+def test_calculate_seconds_until_next_timeframe(current_time, timeframe, expected):
+    assert calculate_seconds_until_next_timeframe(timeframe, current_time) == expected
+
+
+@pytest.mark.parametrize("timeframe", list(Timeframe))
+def test_calculate_seconds_at_boundary_is_full_period(timeframe):
+    boundary = datetime(2024, 3, 15, tzinfo=UTC)
+    
+    assert calculate_seconds_until_next_timeframe(timeframe, boundary) == timeframe.seconds
+
+
+@pytest.mark.parametrize("timeframe", list(Timeframe))
+def test_calculate_seconds_matches_next_boundary(timeframe):
+    current_time = datetime(2024, 3, 15, 13, 47, 29, tzinfo=UTC)
+    
+    _, next_boundary = get_timeframe_boundaries(current_time, timeframe)
+    
+    assert calculate_seconds_until_next_timeframe(timeframe, current_time) == int(
+        (next_boundary - current_time).total_seconds()
+    )
+
+
+def test_calculate_seconds_uses_current_time(monkeypatch):
+    monkeypatch.setattr(
+        helpers_module, 'get_utc_now', lambda: datetime(2024, 3, 15, 13, 59, 30, tzinfo=UTC)
+    )
+    
+    assert calculate_seconds_until_next_timeframe(Timeframe.M15) == 30
@@ -0,0 +1,147 @@
+"""
+Tests for HistoricalDataLoader buffer writes
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.config.constants import Timeframe
+from src.data import historical_loader as historical_loader_module
+from src.data.historical_loader import (
+    Combination, DB_RETRY_ATTEMPTS, HistoricalDataLoader, LoadResult, RatesChunk
+)
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+
+class FakeDatabase:
+    """БД, отклоняющая первые failures попыток COPY"""
+    
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.attempts = 0
+        self.rows = []
+    
+    def copy_candles_batch(self, rows) -> None:
+        self.attempts += 1
+        rows = list(rows)
+        if self.attempts <= self.failures:
+            raise RuntimeError("connection reset")
+        self.rows.extend(rows)
+    
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def loader(monkeypatch, make_component):
+    """Загрузчик без подключений к БД, MT5 и Telegram"""
+    monkeypatch.setattr(historical_loader_module.time, 'sleep', lambda seconds: None)
+    return make_component(HistoricalDataLoader, START, END)
+
+
+def _batch(make_rates):
+    return [
+        RatesChunk('EUR_USD', 1, Timeframe.M5, make_rates(3)),
+        RatesChunk('GBP_USD', 2, Timeframe.M5, make_rates(2))
+    ]
+
+
+def test_flush_buffer_retries_after_error(loader, make_rates):
+    loader.db_manager = FakeDatabase(failures=DB_RETRY_ATTEMPTS - 1)
+    
+    loader._flush_buffer(_batch(make_rates))
+    
+    # Строки каждой попытки строятся заново: последняя получает пакет целиком
+    assert loader.db_manager.attempts == DB_RETRY_ATTEMPTS
+    assert len(loader.db_manager.rows) == 5
+    assert loader.stats['unsaved_candles'] == 0
+
+
+def test_flush_buffer_failure_marks_combinations_failed(loader, make_rates):
+    loader.db_manager = FakeDatabase(failures=DB_RETRY_ATTEMPTS)
+    
+    loader._flush_buffer(_batch(make_rates))
+    
+    assert loader.db_manager.attempts == DB_RETRY_ATTEMPTS
+    assert loader.stats['unsaved_candles'] == 5
+    
+    results = loader._apply_write_failures([
+        LoadResult('EUR_USD', Timeframe.M5, success=True, candles_count=3),
+        LoadResult('GBP_USD', Timeframe.M5, success=True, candles_count=2),
+        LoadResult('USD_JPY', Timeframe.M5, success=True, candles_count=4)
+    ])
+    loader._process_results(results)
+    
+    assert [result.success for result in results] == [False, False, True]
+    assert results[0].error_message == "Failed to write 3 candles to database"
+    assert loader.stats['successful_combinations'] == 1
+    assert loader.stats['failed_combinations'] == 2
+    assert loader.stats['total_candles'] == 4
+
+
+def test_concurrent_flush_failures_are_counted(loader, make_rates):
+    loader.db_manager = FakeDatabase(failures=10 ** 6)
+    threads = [
+        threading.Thread(target=loader._flush_buffer, args=(_batch(make_rates),))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert loader.stats['unsaved_candles'] == 8 * 5
+    assert loader._unsaved == {('EUR_USD', Timeframe.M5): 8 * 3, ('GBP_USD', Timeframe.M5): 8 * 2}
+
+
+SECOND = timedelta(seconds=1)
+COMBINATION = Combination('EUR_USD', 1, Timeframe.M5, Timeframe.M5.id, 1)
+
+
+def _missing_ranges(loader, coverage, start=START, end=END):
+    loader.start_date = start
+    loader.end_date = end
+    loader._coverage = {} if coverage is None else {(1, Timeframe.M5.id): coverage}
+    return loader._missing_ranges(COMBINATION)
+
+
+def test_missing_ranges_without_coverage(loader):
+    assert _missing_ranges(loader, None) == [(START, END)]
+
+
+def test_missing_ranges_treats_naive_dates_as_utc(loader):
+    ranges = _missing_ranges(loader, None, START.replace(tzinfo=None), END.replace(tzinfo=None))
+    
+    assert ranges == [(START, END)]
+
+
+def test_missing_ranges_fully_loaded(loader):
+    assert _missing_ranges(loader, (START, END)) == []
+    assert _missing_ranges(loader, (START - timedelta(days=1), END + timedelta(days=1))) == []
+
+
+def test_missing_ranges_head_and_tail(loader):
+    first = datetime(2024, 1, 10, tzinfo=timezone.utc)
+    last = datetime(2024, 1, 20, tzinfo=timezone.utc)
+    
+    assert _missing_ranges(loader, (first, last)) == [
+        (START, first - SECOND),
+        (last + SECOND, END)
+    ]
+
+
+def test_missing_ranges_tail_only(loader):
+    last = datetime(2024, 1, 20, tzinfo=timezone.utc)
+    
+    assert _missing_ranges(loader, (START - timedelta(days=1), last)) == [(last + SECOND, END)]
+
+
+def test_missing_ranges_coverage_outside_period(loader):
+    # Загружено только то, что позже периода: период целиком перед покрытием
+    first = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    
+    assert _missing_ranges(loader, (first, first + timedelta(days=1))) == [(START, END)]
@@ -0,0 +1,81 @@
+"""
+Tests for MT5Client range loading
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.config.constants import Timeframe, MT5_MAX_BARS_PER_REQUEST
+from src.core import mt5_client as mt5_client_module
+from src.core.mt5_client import MT5Client, MT5QueryError
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def client(make_component):
+    """Клиент, подключенный к подмененному терминалу"""
+    return make_component(MT5Client)
+
+
+@pytest.fixture
+def terminal(monkeypatch):
+    """Терминал MT5, отвечающий на copy_rates_range по списку ответов окон"""
+    calls = []
+    responses = []
+    
+    def copy_rates_range(symbol, timeframe, from_time, to_time):
+        calls.append((from_time, to_time))
+        response = responses[len(calls) - 1]
+        return response(from_time) if callable(response) else response
+    
+    monkeypatch.setattr(mt5_client_module.mt5, 'copy_rates_range', copy_rates_range, raising=False)
+    monkeypatch.setattr(mt5_client_module.mt5, 'last_error', lambda: (-1, 'Terminal: Call failed'), raising=False)
+    return calls, responses
+
+
+@pytest.fixture
+def window_rates(make_rates):
+    """Ответ терминала: бары M5 от начала окна"""
+    return lambda from_time: make_rates(3, int(from_time.timestamp()))
+
+
+def _three_windows_end() -> datetime:
+    """Конец периода, покрывающего три окна запроса M5"""
+    return START + timedelta(minutes=5 * MT5_MAX_BARS_PER_REQUEST) * 3 - timedelta(seconds=1)
+
+
+def test_iter_rates_yields_windows_in_order(client, terminal, window_rates, make_rates):
+    calls, responses = terminal
+    responses.extend([window_rates, make_rates(0), window_rates])
+    
+    windows = list(client.iter_rates('EUR_USD', Timeframe.M5, START, _three_windows_end()))
+    
+    assert len(calls) == 3
+    assert len(windows) == 2
+    assert windows[0]['time'][0] < windows[1]['time'][0]
+    # Окна не пересекаются: следующее начинается через секунду после предыдущего
+    for (_, prev_end), (next_start, _) in zip(calls, calls[1:]):
+        assert next_start == prev_end + timedelta(seconds=1)
+
+
+def test_iter_rates_raises_on_failed_window(client, terminal, window_rates):
+    calls, responses = terminal
+    responses.extend([window_rates, None, window_rates])
+    
+    windows = client.iter_rates('EUR_USD', Timeframe.M5, START, _three_windows_end())
+    
+    assert len(next(windows)) == 3
+    with pytest.raises(MT5QueryError, match='Terminal: Call failed'):
+        next(windows)
+    # После ошибки следующее окно не запрашивается
+    assert len(calls) == 2
+
+
+def test_fetch_rates_raises_on_failed_window(client, terminal, window_rates):
+    _, responses = terminal
+    responses.extend([window_rates, None, window_rates])
+    
+    with pytest.raises(MT5QueryError):
+        client.fetch_rates('EUR_USD', Timeframe.M5, START, _three_windows_end())
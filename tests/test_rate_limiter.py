@@ -0,0 +1,95 @@
+"""
+Tests for TokenBucket rate limiter
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import rate_limiter as rate_limiter_module
+from src.utils.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    """Управляемые монотонные часы"""
+    
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+    
+    def monotonic(self) -> float:
+        return self.now
+    
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(
+        rate_limiter_module, 'time', SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep)
+    )
+    return clock
+
+
+@pytest.mark.parametrize("rate,capacity", [(0, 1), (-1, 1), (1, 0)])
+def test_invalid_arguments(rate, capacity):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=rate, capacity=capacity)
+
+
+def test_burst_is_served_without_waiting(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    
+    assert [bucket._reserve(1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket._reserve(1) == pytest.approx(0.5)
+
+
+def test_tokens_refill_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        bucket._reserve(1)
+    
+    clock.now += 1.0
+    assert bucket._reserve(2) == 0.0
+    assert bucket._reserve(1) == pytest.approx(0.5)
+    
+    # Долгий простой не накапливает больше capacity
+    clock.now += 60
+    assert [bucket._reserve(1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket._reserve(1) > 0
+
+
+def test_reserve_debt_queues_callers(clock):
+    bucket = TokenBucket(rate=4, capacity=1)
+    bucket._reserve(1)
+    
+    # Каждый следующий вызов ждет погашения долга предыдущих
+    assert bucket._reserve(1) == pytest.approx(0.25)
+    assert bucket._reserve(1) == pytest.approx(0.5)
+    assert bucket._reserve(1) == pytest.approx(0.75)
+    
+    clock.now += 0.75
+    assert bucket._reserve(1) == pytest.approx(0.25)
+
+
+def test_acquire_sleeps_for_reserved_delay(clock):
+    bucket = TokenBucket(rate=4, capacity=1)
+    
+    assert bucket.acquire() is True
+    assert bucket.acquire() is True
+    assert clock.sleeps == [pytest.approx(0.25)]
+
+
+def test_acquire_returns_false_when_stopped(clock):
+    bucket = TokenBucket(rate=0.001, capacity=1)
+    stop_event = threading.Event()
+    
+    assert bucket.acquire(stop_event=stop_event) is True
+    stop_event.set()
+    assert bucket.acquire(stop_event=stop_event) is False
+    assert clock.sleeps == []
+
@@ -0,0 +1,190 @@
+"""
+Tests for RealTimeDataUpdater writer thread
+"""
+
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from src.config.constants import Timeframe
+from src.data import real_time_updater as real_time_updater_module
+from src.data.real_time_updater import RealTimeDataUpdater, UpdateResult
+
+LAST_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _item(symbol: str, rows: int = 1):
+    """Результат комбинации и ее строки для очереди записи"""
+    result = UpdateResult(
+        symbol=symbol,
+        timeframe=Timeframe.M5,
+        success=True,
+        new_candles=rows,
+        last_candle_time=LAST_TIME
+    )
+    return result, [(1, Timeframe.M5.id, LAST_TIME, 1.1, 1.2, 1.0, 1.1, 10)] * rows
+
+
+@pytest.fixture
+def make_updater(monkeypatch, make_component):
+    """Обновлятель без подключений к БД, MT5 и Telegram"""
+    monkeypatch.setattr(real_time_updater_module, 'WRITE_RESULT_POLL_INTERVAL', 0.01)
+    releases = []
+    
+    def make(insert_batch=None, start_writer: bool = True) -> RealTimeDataUpdater:
+        updater = make_component(RealTimeDataUpdater)
+        if insert_batch is not None:
+            updater._insert_batch = insert_batch
+        
+        if not start_writer:
+            # Поток жив, но очередь не читает (зависшая запись)
+            updater._insert_queue.put(None)
+            updater._writer_thread.join()
+            release = threading.Event()
+            updater._writer_thread = threading.Thread(target=release.wait, daemon=True)
+            updater._writer_thread.start()
+            releases.append(release)
+        return updater
+    
+    yield make
+    
+    for release in releases:
+        release.set()
+
+
+def test_writer_survives_unexpected_batch_error(make_updater):
+    calls = []
+    
+    def insert_batch(batch_results, rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise ValueError("unexpected")
+        return batch_results
+    
+    updater = make_updater(insert_batch)
+    
+    updater._insert_queue.put(_item('EUR_USD'))
+    results = updater._finish_writes()
+    assert [result.success for result in results] == [False]
+    assert "unexpected" in results[0].error_message
+    
+    # Поток записи продолжает работать в следующем цикле
+    updater._insert_queue.put(_item('GBP_USD'))
+    results = updater._finish_writes()
+    assert [result.success for result in results] == [True]
+    assert updater._writer_thread.is_alive()
+
+
+def test_writer_reports_bad_item_to_cycle_marker(make_updater):
+    updater = make_updater(lambda batch_results, rows: batch_results)
+    
+    updater._insert_queue.put(object())
+    updater._insert_queue.put(_item('EUR_USD'))
+    results = updater._finish_writes()
+    
+    assert [result.symbol for result in results] == ['EUR_USD']
+    assert updater._writer_thread.is_alive()
+
+
+def test_finish_writes_fails_when_writer_stopped(make_updater):
+    updater = make_updater()
+    updater._insert_queue.put(None)
+    updater._writer_thread.join(timeout=1)
+    
+    with pytest.raises(RuntimeError):
+        updater._finish_writes()
+
+
+def test_finish_writes_gives_up_after_stop_signal(make_updater, monkeypatch):
+    monkeypatch.setattr(real_time_updater_module, 'WRITE_STOP_TIMEOUT', 0.05)
+    updater = make_updater(start_writer=False)
+    updater._stop_event.set()
+    
+    with pytest.raises(TimeoutError):
+        updater._finish_writes()
+
+
+class FailingLastTimesDatabase:
+    """БД, у которой пакетный запрос последних свечей всегда падает"""
+    
+    def __init__(self, last_times, failing_pairs=()):
+        self.last_times = last_times
+        self.failing_pairs = set(failing_pairs)
+    
+    def get_last_candle_times(self, pairs):
+        raise RuntimeError("connection reset")
+    
+    def close(self) -> None:
+        pass
+    
+    def get_last_candle_time(self, symbol_id, timeframe_id):
+        if (symbol_id, timeframe_id) in self.failing_pairs:
+            raise RuntimeError("connection reset")
+        return self.last_times.get((symbol_id, timeframe_id))
+
+
+def _combination(symbol: str, symbol_id: int):
+    return {
+        'symbol': symbol,
+        'symbol_id': symbol_id,
+        'timeframe': Timeframe.M5,
+        'timeframe_id': Timeframe.M5.id,
+        'priority': 1
+    }
+
+
+def test_last_candle_times_fall_back_to_per_combination_lookup(make_updater, monkeypatch):
+    monkeypatch.setattr(real_time_updater_module.time, 'sleep', lambda seconds: None)
+    updater = make_updater(start_writer=False)
+    updater.db_manager = FailingLastTimesDatabase(
+        {(1, Timeframe.M5.id): LAST_TIME}, failing_pairs=[(3, Timeframe.M5.id)]
+    )
+    
+    last_times = updater._get_last_candle_times(
+        [_combination('EUR_USD', 1), _combination('GBP_USD', 2), _combination('USD_JPY', 3)]
+    )
+    
+    # Свечей GBP_USD нет (None), время USD_JPY неизвестно (нет в словаре)
+    assert last_times == {(1, Timeframe.M5.id): LAST_TIME, (2, Timeframe.M5.id): None}
+
+
+def test_update_sequential_fails_only_combinations_without_last_time(make_updater, monkeypatch):
+    monkeypatch.setattr(real_time_updater_module.time, 'sleep', lambda seconds: None)
+    updater = make_updater(lambda batch_results, rows: batch_results)
+    updater.db_manager = FailingLastTimesDatabase({}, failing_pairs=[(2, Timeframe.M5.id)])
+    updated = []
+    
+    def update_single_combination(combination, last_db_time):
+        updated.append(combination['symbol'])
+        return _item(combination['symbol'])
+    
+    updater._update_single_combination = update_single_combination
+    
+    results = updater._update_sequential([_combination('EUR_USD', 1), _combination('GBP_USD', 2)])
+    
+    assert updated == ['EUR_USD']
+    assert {result.symbol: result.success for result in results} == {'EUR_USD': True, 'GBP_USD': False}
+
+
+class RecordingTelegram:
+    def __init__(self):
+        self.messages = []
+    
+    def send_message_nowait(self, message, topic="system"):
+        self.messages.append(message)
+    
+    def close(self) -> None:
+        pass
+
+
+def test_smart_update_notification_lists_timeframe_names(make_updater):
+    updater = make_updater()
+    updater.telegram = RecordingTelegram()
+    results = [{'total_candles': 3, 'combinations_count': 2, 'successful_count': 2}]
+    
+    updater._send_smart_update_notification([Timeframe.M5, Timeframe.H1], results, 1.5)
+    
+    # Значения Timeframe - числа auto(), в сообщение попадают имена
+    assert len(updater.telegram.messages) == 1
+    assert "Активные таймфреймы: M5, H1" in updater.telegram.messages[0]
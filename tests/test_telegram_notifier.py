@@ -0,0 +1,212 @@
+"""
+Tests for TelegramNotifier sending
+"""
+
+import threading
+
+import pytest
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+
+from src.core.telegram_notifier import (
+    TelegramClosingError, TelegramNotifier, TelegramRateLimitError,
+    _BATCH_MESSAGE_LENGTH, _BATCH_SEPARATOR, _MAX_MESSAGE_LENGTH
+)
+
+
+class FakeResponse:
+    status_code = 200
+    
+    def raise_for_status(self) -> None:
+        pass
+
+
+@pytest.fixture
+def make_notifier():
+    """Уведомитель с подменой HTTP запросов"""
+    notifiers = []
+    
+    def make(**config) -> TelegramNotifier:
+        notifier = TelegramNotifier({'bot_token': 'token', 'chat_id': '1', **config})
+        notifier.sent = []
+        notifier.session.post = lambda url, data, headers, timeout: notifier.sent.append(data) or FakeResponse()
+        notifiers.append(notifier)
+        return notifier
+    
+    yield make
+    
+    for notifier in notifiers:
+        notifier.close()
+
+
+class FakeLimiter:
+    """Лимитер, выдающий available токенов, затем отказывающий при остановке"""
+    
+    def __init__(self, available: int):
+        self.available = available
+        self.calls = []
+    
+    def acquire(self, tokens: int = 1, stop_event=None) -> bool:
+        self.calls.append(stop_event)
+        if self.available > 0:
+            self.available -= 1
+            return True
+        return stop_event is None or not stop_event.is_set()
+
+
+def test_post_message_waits_for_limiter_with_stop_event(make_notifier):
+    notifier = make_notifier()
+    notifier._rate_limiter = FakeLimiter(available=1)
+    
+    notifier._post_message("message", "system")
+    
+    assert notifier._rate_limiter.calls == [notifier._stop_event]
+    assert len(notifier.sent) == 1
+
+
+def test_post_message_is_not_sent_when_closing_without_tokens(make_notifier):
+    notifier = make_notifier()
+    notifier._rate_limiter = FakeLimiter(available=1)
+    notifier._stop_event.set()
+    
+    notifier._post_message("within burst", "system")
+    with pytest.raises(TelegramClosingError):
+        notifier._post_message("over limit", "system")
+    
+    assert len(notifier.sent) == 1
+
+
+def test_close_requeues_messages_over_limit(make_notifier):
+    notifier = make_notifier(batch_enabled=True, batch_flush_interval=3600)
+    notifier._rate_limiter = FakeLimiter(available=1)
+    notifier.send_message("x" * _BATCH_MESSAGE_LENGTH, "system")
+    notifier.send_message("y" * _BATCH_MESSAGE_LENGTH, "trades")
+    
+    notifier.close()
+    
+    # Финальный сброс отправил пакет в пределах запаса, остальное осталось в очереди
+    assert len(notifier.sent) == 1
+    assert list(notifier._queue.queue) == [("trades", "y" * _BATCH_MESSAGE_LENGTH)]
+    assert not notifier._flush_thread.is_alive()
+
+
+def test_retry_repeats_post_only_on_rate_limit_and_connect_errors(make_notifier):
+    retry = make_notifier(retry_attempts=3)._create_retry()
+    
+    assert retry.is_retry('POST', 429, has_retry_after=True)
+    assert not retry.is_retry('POST', 500)
+    assert not retry.is_retry('POST', 502)
+    assert retry.connect == 2
+    
+    with pytest.raises(MaxRetryError):
+        retry.increment('POST', '/sendMessage', error=ReadTimeoutError(None, '/sendMessage', 'timeout'))
+
+
+def test_pack_messages_joins_small_messages():
+    packed = list(TelegramNotifier._pack_messages(["a", "b", "c"]))
+    
+    assert packed == [_BATCH_SEPARATOR.join(["a", "b", "c"])]
+
+
+def test_pack_messages_respects_batch_length():
+    message = "x" * (_BATCH_MESSAGE_LENGTH // 2)
+    
+    packed = list(TelegramNotifier._pack_messages([message] * 3))
+    
+    # Два сообщения с разделителем длиннее лимита - каждое в своем пакете
+    assert packed == [message] * 3
+    assert all(len(text) <= _BATCH_MESSAGE_LENGTH for text in packed)
+
+
+def test_pack_messages_splits_oversized_message():
+    long_message = "y" * (_MAX_MESSAGE_LENGTH * 2 + 10)
+    
+    packed = list(TelegramNotifier._pack_messages(["before", long_message, "after"]))
+    
+    assert packed[0] == "before"
+    assert "".join(packed[1:-1]) == long_message
+    assert all(len(text) <= _MAX_MESSAGE_LENGTH for text in packed)
+    assert packed[-1] == "after"
+
+
+def test_split_message_cuts_at_newline():
+    message = "<b>line</b>\n" * 1000
+    
+    parts = list(TelegramNotifier._split_message(message))
+    
+    assert "".join(parts) == message
+    assert all(len(part) <= _MAX_MESSAGE_LENGTH for part in parts)
+    assert all(part.endswith("\n") for part in parts[:-1])
+
+
+def test_split_message_never_cuts_inside_tag_or_entity():
+    message = "<b>bold text</b> word &amp; " * 400
+    
+    parts = list(TelegramNotifier._split_message(message))
+    
+    assert "".join(parts) == message
+    for part in parts:
+        assert len(part) <= _MAX_MESSAGE_LENGTH
+        assert part.count("<b>") == part.count("</b>")
+        assert part.startswith("<b>")
+        assert part.count("&") == part.count("&amp;")
+
+
+def test_pack_messages_keeps_order():
+    messages = [f"message {i} " + "z" * 500 for i in range(20)]
+    
+    packed = list(TelegramNotifier._pack_messages(messages))
+    
+    assert _BATCH_SEPARATOR.join(packed) == _BATCH_SEPARATOR.join(messages)
+
+
+def test_requeue_drops_message_when_buffer_is_full(make_notifier):
+    notifier = make_notifier(max_buffer_size=1)
+    
+    notifier._requeue("system", "first")
+    notifier._requeue("system", "second")
+    
+    assert notifier._queue.qsize() == 1
+    assert notifier._queue.get_nowait() == ("system", "first")
+
+
+def test_flush_requeues_rest_after_rate_limit(make_notifier, monkeypatch):
+    notifier = make_notifier()
+    posted = []
+    
+    def post_message(text, topic):
+        posted.append((topic, text))
+        if len(posted) == 1:
+            raise TelegramRateLimitError("Telegram rate limit exceeded", retry_after=0)
+        return True
+    
+    monkeypatch.setattr(notifier, '_post_message', post_message)
+    notifier._queue.put(("system", "one"))
+    notifier._queue.put(("trades", "two"))
+    
+    notifier.flush()
+    
+    # Сообщение с 429 и все после него возвращаются в очередь
+    assert posted == [("system", "one")]
+    assert list(notifier._queue.queue) == [("system", "one"), ("trades", "two")]
+    
+    notifier.flush()
+    assert posted[1:] == [("system", "one"), ("trades", "two")]
+    assert notifier._queue.empty()
+
+
+def test_send_message_does_not_block_when_buffer_is_full(make_notifier, monkeypatch):
+    notifier = make_notifier(batch_enabled=True, batch_flush_interval=3600, max_buffer_size=1)
+    posted = threading.Event()
+    
+    def post_message(text, topic):
+        # Вызывающий поток сюда не попадает
+        assert threading.current_thread() is not threading.main_thread()
+        posted.set()
+        return True
+    
+    monkeypatch.setattr(notifier, '_post_message', post_message)
+    
+    assert notifier.send_message("first") is True
+    assert notifier.send_message("second") is True
+    assert posted.wait(timeout=5)
+    assert list(notifier._queue.queue) == [("system", "first")]